@@ -48,6 +48,14 @@ interface Part {
   alternatesByType?: Record<RelationshipType, RelationshipDescription>
 }
 
+// Same key as normalize_part_num in scripts/data_processing/part_numbers.py
+function normalizePartNum(partNum: string): string {
+  return partNum
+    .replace(/[^a-zA-Z0-9]/g, '')
+    .toLowerCase()
+    .replace(/^0+/, '')
+}
+
 export async function GET(request: NextRequest, { params }: { params: Promise<{ id: string }> }) {
   const { id: partId } = await params
 
@@ -74,11 +82,16 @@ export async function GET(request: NextRequest, { params }: { params: Promise<{
       LEFT JOIN ba_categories b ON p.ba_cat_id = b.id
       LEFT JOIN ba_categories parent ON b.parent_id = parent.id
       LEFT JOIN ba_categories grandparent ON parent.parent_id = grandparent.id
-      WHERE p.part_num = ?
     `
 
     console.log(`Executing query for part ${partId}`)
-    const part: Part | undefined = await db.get(query, partId)
+    // Fall back to the indexed normalized key so "3001" finds "003001"
+    // (the column is added by scripts/data_processing/update_database_enhanced.py)
+    const part: Part | undefined =
+      (await db.get(`${query} WHERE p.part_num = ?`, partId)) ??
+      (await db
+        .get(`${query} WHERE p.part_num_normalized = ? ORDER BY p.part_num LIMIT 1`, normalizePartNum(partId))
+        .catch(() => undefined))
 
     if (!part) {
       console.log(`Part ${partId} not found in database`)
@@ -86,6 +99,7 @@ export async function GET(request: NextRequest, { params }: { params: Promise<{
     }
 
     console.log(`Found part ${partId}: ${part.name}`)
+    const partNum = part.id
 
     // Enhance the part data for the modal
     part.description = part.ba_category_name || part.category_name
@@ -111,8 +125,8 @@ export async function GET(request: NextRequest, { params }: { params: Promise<{
     `
 
     const alternateIds: { alt_id: string; rel_type: RelationshipType }[] = await db.all(alternateIdsQuery, [
-      partId,
-      partId,
+      partNum,
+      partNum,
     ])
 
     // Group the alternate IDs by relationship type with descriptions
@@ -150,13 +164,13 @@ export async function GET(request: NextRequest, { params }: { params: Promise<{
 
       // Fill with actual data
       alternateIds.forEach((item) => {
-        if (item.alt_id !== partId && relationshipDescriptions[item.rel_type]) {
+        if (item.alt_id !== partNum && relationshipDescriptions[item.rel_type]) {
           part.alternatesByType![item.rel_type].ids.push(item.alt_id)
         }
       })
 
       // Also keep the flat list for backward compatibility
-      part.alternateIds = alternateIds.map((item) => item.alt_id).filter((altId) => altId !== partId)
+      part.alternateIds = alternateIds.map((item) => item.alt_id).filter((altId) => altId !== partNum)
     } else {
       part.alternateIds = []
       part.alternatesByType = {} as Record<RelationshipType, RelationshipDescription>
@@ -455,6 +455,46 @@ function buildCombinedSearch(
   return { query, params, countQuery, countParams }
 }
 
+// Element ids (printed on bags) and design ids are resolved through the lookup
+// tables built by scripts/data_processing/element_lookup.py, when they exist
+// Only a successful probe is cached, so building the tables later takes effect without a restart
+let hasElementLookup = false
+
+async function resolveNumericId(db: Database, q: string): Promise<string[]> {
+  // Same limit as MAX_ID_DIGITS in element_lookup.py
+  if (!/^\d{1,10}$/.test(q)) return []
+  if (!hasElementLookup) {
+    const row = await db
+      .get(`SELECT COUNT(*) AS count FROM sqlite_master WHERE type = 'table' AND name = 'element_lookup'`)
+      .catch(() => undefined)
+    hasElementLookup = (row?.count ?? 0) > 0
+    if (!hasElementLookup) return []
+  }
+
+  const rows: { part_num: string }[] = await db.all(
+    `SELECT part_num FROM element_lookup WHERE element_id = ?1
+     UNION
+     SELECT part_num FROM design_lookup WHERE design_id = ?1`,
+    Number(q)
+  )
+  return rows.map((row) => row.part_num)
+}
+
+// Add the parts an element or design id resolved to
+function addElementMatches(baseQuery: string, queryData: QueryData, partNums: string[]): QueryData {
+  if (partNums.length === 0) return queryData
+
+  const { query, params, countQuery, countParams } = queryData
+  const placeholders = partNums.map(() => '?').join(',')
+
+  return {
+    query: `${query} UNION ALL SELECT * FROM (${baseQuery} WHERE p.part_num IN (${placeholders}))`,
+    params: [...params, ...partNums],
+    countQuery: `${countQuery} OR p.part_num IN (${placeholders})`,
+    countParams: [...countParams, ...partNums],
+  }
+}
+
 // Add category filters to a query
 function addCategoryFilter(queryData: QueryData, categoryIds: string[]): QueryData {
   const { query, params, countQuery, countParams } = queryData
@@ -669,6 +709,7 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
         queryData = buildMultiWordSearch(baseQuery, analysis.searchTerm, q, analysis.multiWordSearch)
       } else {
         queryData = buildBasicSearch(baseQuery, analysis.searchTerm, q)
+        queryData = addElementMatches(baseQuery, queryData, await resolveNumericId(db, q.trim()))
       }
 
       // Add category filter if needed
@@ -1,27 +1,11 @@
 import csv
 from collections import Counter
 
-# Read categories data
-categories = {}
-parent_categories = {}
+from category_closure import read_category_parents
+from category_rollups import compute_rollups
 
-with open('data/ba_categories.csv', 'r') as f:
-    reader = csv.reader(f)
-    next(reader)  # Skip header
-
-    for row in reader:
-        cat_id = row[0]
-        cat_name = row[1]
-        parent_id = row[2]
-
-        categories[cat_id] = {
-            'name': cat_name,
-            'parent_id': parent_id
-        }
-
-        # If this is a top-level category (empty parent_id), store it separately
-        if parent_id == '':
-            parent_categories[cat_id] = cat_name
+# Read categories data
+names, parents = read_category_parents('data/ba_categories.csv')
 
 # Read parts data and count by category
 category_counts = Counter()
@@ -31,34 +15,30 @@ with open('data/ba_parts.csv', 'r') as f:
     next(reader)  # Skip header
 
     for row in reader:
-        category_id = row[2]
+        category_id = int(row[2])
         category_counts[category_id] += 1
 
+# Direct and subtree counts for every category in one pass over the hierarchy
+rollups = compute_rollups(parents, category_counts)
+
 # Print top-level categories and their part counts
 print("Top-level categories:")
-for parent_id, parent_name in sorted(parent_categories.items(), key=lambda x: int(x[0])):
-    parent_part_count = sum(count for cat_id, count in category_counts.items()
-                           if categories.get(cat_id, {}).get('parent_id') == parent_id
-                           or cat_id == parent_id)
-    print(f"{parent_id}: {parent_name} - {parent_part_count} parts")
+for parent_id in sorted(cat_id for cat_id in names if parents[cat_id] is None):
+    print(f"{parent_id}: {names[parent_id]} - {rollups[parent_id][1]} parts")
 
 # Also show the distribution for subcategories of category 1 (Basic)
 print("\nSubcategories of 1. Basic:")
-for cat_id, cat_info in sorted(categories.items(), key=lambda x: int(x[0])):
-    if cat_info['parent_id'] == '1':  # If parent is the Basic category
-        part_count = sum(count for c_id, count in category_counts.items()
-                        if categories.get(c_id, {}).get('parent_id') == cat_id
-                        or c_id == cat_id)
-        print(f"{cat_id}: {cat_info['name']} - {part_count} parts")
+for cat_id in sorted(cat_id for cat_id in names if parents[cat_id] == 1):  # If parent is the Basic category
+    print(f"{cat_id}: {names[cat_id]} - {rollups[cat_id][1]} parts")
 
 # Show parts distribution across all categories
 print("\nParts per category (all levels):")
-sorted_categories = sorted([(cat_id, categories[cat_id]['name'], category_counts[cat_id])
-                           for cat_id in categories if cat_id in category_counts],
+sorted_categories = sorted([(cat_id, names[cat_id], category_counts[cat_id])
+                           for cat_id in names if cat_id in category_counts],
                           key=lambda x: x[2], reverse=True)
 for cat_id, cat_name, count in sorted_categories[:20]:  # Show top 20
     print(f"{cat_id}: {cat_name} - {count} parts")
 
-print(f"\nTotal categories: {len(categories)}")
+print(f"\nTotal categories: {len(names)}")
 print(f"Categories with parts: {len(category_counts)}")
 print(f"Total parts: {sum(category_counts.values())}")
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Popularity-weighted type-ahead completions.
+
+A part's popularity comes from the Rebrickable element data: every element
+(a part in a particular colour) counts once, and every distinct colour adds
+that colour's share of all parts produced (num_parts in colors.csv), so a
+part made in Black and Light Bluish Gray outranks one only made in a rare
+colour. For every normalized token prefix and part number prefix the top-N
+parts by popularity are stored, so a keystroke is answered by one dict lookup.
+Dimensions are also stored as single tokens ("1x2"), the way
+synonyms.query_tokens writes them in a query. The empty prefix lists every
+part by popularity, which ranks multi-word queries whose stored list for the
+last word runs short.
+"""
+import csv
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+
+from search_text import normalize_text
+from synonyms import dimension_tokens, query_tokens
+
+ELEMENTS_CSV = 'data/elements.csv'
+COLORS_CSV = 'data/colors.csv'
+TOP_N = 10
+
+
+def load_color_weights(path=COLORS_CSV):
+    """Map color id to its num_parts, scaled so the most used color is 1.0"""
+    num_parts = {}
+    with open(path, 'r') as f:
+        for row in csv.DictReader(f):
+            num_parts[row['id']] = int(row['num_parts'] or 0)
+
+    most = max(num_parts.values(), default=0) or 1
+    return {color_id: count / most for color_id, count in num_parts.items()}
+
+
+def compute_popularity(elements_path=ELEMENTS_CSV, colors_path=COLORS_CSV):
+    """Return {part_num: weight} for every part that appears in elements.csv"""
+    color_weights = load_color_weights(colors_path)
+    element_counts = defaultdict(int)
+    part_colors = defaultdict(set)
+
+    with open(elements_path, 'r') as f:
+        for row in csv.DictReader(f):
+            element_counts[row['part_num']] += 1
+            part_colors[row['part_num']].add(row['color_id'])
+
+    return {
+        part_num: count + sum(color_weights.get(color_id, 0) for color_id in part_colors[part_num])
+        for part_num, count in element_counts.items()
+    }
+
+
+# "1 x 2" and a half-typed "2 x" are written "1x2" and "2x", like the stored dimension tokens
+PARTIAL_DIMENSION = re.compile(r'(?<=\d)\s*[x×]\s*(?=\d|$)', re.IGNORECASE)
+
+_keys_cache = {}
+# (parts, their part number tokens sorted) for the parts last completed against
+_part_number_tokens = (None, [])
+
+
+def completion_keys(part):
+    """Return the tokens a part completes under: name words, dimensions and part number"""
+    cache_key = (part['id'], part['name'])
+    keys = _keys_cache.get(cache_key)
+    if keys is None:
+        keys = (part['normalized_name'].split() + sorted(dimension_tokens(part['name']))
+                + normalize_text(part['id']).split())
+        _keys_cache[cache_key] = keys
+    return keys
+
+
+def build_completions(parts, popularity, top_n=TOP_N):
+    """
+    Map every name token prefix and part number prefix to its top_n part
+    ordinals, and the empty prefix to every ordinal in popularity order.
+    """
+    candidates = defaultdict(set)
+    for ordinal, part in enumerate(parts):
+        for key in completion_keys(part):
+            for length in range(1, len(key) + 1):
+                candidates[key[:length]].add(ordinal)
+
+    # Most popular first; ties go to the shorter, then lower, part number
+    def rank(ordinal):
+        part_id = parts[ordinal]['id']
+        return (-popularity.get(part_id, 0), len(part_id), part_id)
+
+    completions = {'': sorted(range(len(parts)), key=rank)}
+    for prefix, ordinals in sorted(candidates.items()):
+        completions[prefix] = heapq.nsmallest(top_n, ordinals, key=rank)
+    return completions
+
+
+def _starts_part_number(parts, token):
+    """True if token is a prefix of some part number token, which the inverted index doesn't hold"""
+    global _part_number_tokens
+    if _part_number_tokens[0] is not parts:
+        _part_number_tokens = (parts, sorted({t for part in parts for t in normalize_text(part['id']).split()}))
+    tokens = _part_number_tokens[1]
+    position = bisect_left(tokens, token)
+    return position < len(tokens) and tokens[position].startswith(token)
+
+
+def _matches_all(part, tokens):
+    keys = completion_keys(part)
+    return all(any(key.startswith(token) for key in keys) for token in tokens)
+
+
+def complete(completions, parts, text, index=None, top_n=TOP_N):
+    """
+    Return completion ordinals for what has been typed so far, most popular
+    first. The stored list for the last token is filtered by the earlier
+    words. When that leaves fewer than top_n, the parts matching every token
+    are taken in popularity order instead, narrowed first by the inverted index
+    when a synonym-expanded one (which has dimension tokens) is given. The index
+    only holds name tokens, so it narrows on the words no part number starts with.
+    """
+    text = PARTIAL_DIMENSION.sub('x', text)
+    tokens = query_tokens(text)
+    if not tokens:
+        return []
+
+    ordinals = [o for o in completions.get(tokens[-1], []) if _matches_all(parts[o], tokens[:-1])]
+    if len(tokens) == 1 or len(ordinals) >= top_n or '' not in completions:
+        return ordinals
+
+    # Every part in the filtered list matches all tokens too, so this ranking includes it
+    candidates = completions['']
+    if index is not None and index.get('expanded'):
+        postings = [index['prefixes'].get(token, []) for token in set(tokens)
+                    if len(token) >= index['min_prefix'] and not _starts_part_number(parts, token)]
+        if postings:
+            matching = set(min(postings, key=len)).intersection(*postings)
+            candidates = [o for o in candidates if o in matching]
+    return list(islice((o for o in candidates if _matches_all(parts[o], tokens)), top_n))
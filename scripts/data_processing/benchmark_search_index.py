@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the search index structures built by create_search_index.py.
+Run from the repository root after building data/search_index.json.
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import create_search_index
+from autocomplete import build_completions, complete, compute_popularity
+from binary_index import BinarySearchIndex
+from inverted_index import build_inverted_index, linear_lookup, lookup
+from query_planner import build_category_stats, planned_search
+from search_index_v2 import build_v2, expand_v2
+from synonyms import expand_tokens, load_rebrickable_names
+from spelling import brute_force_suggest, build_dictionary, build_vocabulary, suggest
+
+INDEX_PATH = 'data/search_index.json'
+BINARY_PATH = 'data/search_index.bin'
+
+# A mix of single words, prefixes and multi-word queries typed into the search box
+SAMPLE_QUERIES = [
+    'brick', 'plate', '1 2', '2x4', 'tile 1 2', 'slope 45', 'tech', 'technic beam',
+    'round', 'hinge plate', 'wedge', 'br', 'p', 'minifig', 'bracket 1 2', 'axle 3'
+]
+
+
+def time_per_query(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def load_parts(path):
+    with open(path, 'r') as f:
+        return json.load(f)['parts']
+
+
+def bench_inverted(args):
+    parts = load_parts(args.index)
+
+    start = time.perf_counter()
+    index = build_inverted_index(parts)
+    build_time = time.perf_counter() - start
+
+    # Both paths must agree before their timings mean anything
+    for query in SAMPLE_QUERIES:
+        assert lookup(index, query) == linear_lookup(parts, query), query
+
+    indexed = time_per_query(lambda q: lookup(index, q), SAMPLE_QUERIES, args.repeat)
+    linear = time_per_query(lambda q: linear_lookup(parts, q), SAMPLE_QUERIES, args.repeat)
+    substring = time_per_query(
+        lambda q: [i for i, p in enumerate(parts) if q in p['normalized_name']],
+        SAMPLE_QUERIES, args.repeat)
+
+    print(f"Parts: {len(parts)}, tokens: {len(index['tokens'])}, prefixes: {len(index['prefixes'])}")
+    print(f"Index build: {build_time * 1000:.1f} ms")
+    print(f"Posting lookup:       {indexed * 1e6:9.1f} us/query")
+    print(f"Linear token scan:    {linear * 1e6:9.1f} us/query ({linear / indexed:.0f}x slower)")
+    print(f"Linear substring scan:{substring * 1e6:9.1f} us/query ({substring / indexed:.0f}x slower)")
+
+
+def bench_binary(args):
+    start = time.perf_counter()
+    binary = BinarySearchIndex(args.binary)
+    binary_open = time.perf_counter() - start
+
+    # Compare against postings built the way create_search_index.py built the binary's
+    rebrickable_names = load_rebrickable_names() if binary.expanded else {}
+    start = time.perf_counter()
+    with open(args.index, 'r') as f:
+        parts = json.load(f)['parts']
+    if binary.expanded:
+        index = build_inverted_index(
+            parts, part_tokens=lambda part: expand_tokens(part['name'], [rebrickable_names.get(part['id'])]))
+    else:
+        index = build_inverted_index(parts)
+    json_open = time.perf_counter() - start
+
+    try:
+        for query in SAMPLE_QUERIES:
+            assert binary.lookup(query) == lookup(index, query), query
+
+        indexed = time_per_query(lambda q: lookup(index, q), SAMPLE_QUERIES, args.repeat)
+        mapped = time_per_query(binary.lookup, SAMPLE_QUERIES, args.repeat)
+    finally:
+        binary.close()
+
+    print(f"JSON load + postings: {json_open * 1000:9.1f} ms")
+    print(f"Binary open (mmap):   {binary_open * 1000:9.3f} ms")
+    print(f"In-memory lookup:     {indexed * 1e6:9.1f} us/query")
+    print(f"Mapped lookup:        {mapped * 1e6:9.1f} us/query")
+
+
+def scaled_parts_csv(path, scale):
+    """Write a copy of ba_parts.csv repeated scale times with unique part numbers"""
+    with open(create_search_index.PARTS_CSV, 'r') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        for copy in range(scale):
+            for row in rows:
+                writer.writerow([f"{row[0]}-{copy}" if copy else row[0]] + row[1:])
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_stream(args):
+    categories = create_search_index.build_categories(create_search_index.read_category_rows())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, 'search_index.out')
+        for scale in (1, args.scale):
+            parts_csv = os.path.join(tmp, f'parts_{scale}.csv')
+            scaled_parts_csv(parts_csv, scale)
+
+            def in_memory():
+                parts = [create_search_index.enrich_part(create_search_index.build_part(row), categories)
+                         for row in create_search_index.iter_part_rows(parts_csv)]
+                create_search_index.write_json(out_path, {'parts': parts, 'categories': list(categories.values())})
+
+            def streamed(output_format):
+                create_search_index.write_stream(
+                    out_path, create_search_index.iter_parts(categories, parts_csv), categories, output_format)
+
+            print(f"Catalog x{scale}:")
+            for label, fn in (('in-memory, indent=2', in_memory),
+                              ('stream ndjson', lambda: streamed('ndjson')),
+                              ('stream json', lambda: streamed('json'))):
+                elapsed, peak = measure(fn)
+                print(f"  {label:20} {elapsed * 1000:8.0f} ms  peak {peak / 1024 / 1024:7.2f} MiB")
+
+
+def bench_schema(args):
+    with open(args.index, 'r') as f:
+        v1 = json.load(f)
+    v2 = build_v2(v1['parts'], v1['categories'])
+
+    payloads = [
+        ('v1 indent=2', json.dumps(v1, indent=2).encode('utf-8')),
+        ('v1 minified', json.dumps(v1, separators=(',', ':')).encode('utf-8')),
+        ('v2 minified', json.dumps(v2, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+    ]
+
+    print(f"{'format':14} {'bytes':>9} {'gzip':>8} {'parse ms':>9}")
+    for label, payload in payloads:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            json.loads(payload)
+        parse = (time.perf_counter() - start) / args.repeat
+        print(f"{label:14} {len(payload):9} {len(gzip.compress(payload, 9)):8} {parse * 1000:9.2f}")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        expand_v2(v2)
+    print(f"v2 expand to v1 records: {(time.perf_counter() - start) / args.repeat * 1000:.2f} ms")
+
+
+# Misspellings seen in searches, plus a few correct words
+SAMPLE_TYPOS = ['sloap', 'tecnic', 'brik', 'plat', 'hing', 'bracket', 'cyllinder', 'minifgure',
+                'wedgde', 'technik', 'windscren', 'tyle', 'arch', 'cone', 'pnuematic', 'axel']
+
+
+def bench_spelling(args):
+    with open(args.index, 'r') as f:
+        search_index = json.load(f)
+    vocabulary = build_vocabulary(
+        [part['name'] for part in search_index['parts']]
+        + [category['name'] for category in search_index['categories']])
+
+    start = time.perf_counter()
+    dictionary = build_dictionary(vocabulary)
+    build_time = time.perf_counter() - start
+
+    for word in SAMPLE_TYPOS:
+        assert suggest(dictionary, word) == brute_force_suggest(vocabulary, word), word
+
+    symmetric = time_per_query(lambda w: suggest(dictionary, w), SAMPLE_TYPOS, args.repeat)
+    brute = time_per_query(lambda w: brute_force_suggest(vocabulary, w), SAMPLE_TYPOS, 1)
+
+    print(f"Vocabulary: {len(vocabulary)} words, {len(dictionary['deletes'])} delete keys")
+    print(f"Dictionary build: {build_time * 1000:.1f} ms")
+    print(f"Symmetric delete:       {symmetric * 1e6:10.1f} us/word")
+    print(f"Brute-force Levenshtein:{brute * 1e6:10.1f} us/word ({brute / symmetric:.0f}x slower)")
+    for word in SAMPLE_TYPOS[:6]:
+        print(f"  {word!r:12} -> {[w for w, _, _ in suggest(dictionary, word, limit=3)]}")
+
+
+PLANNER_QUERIES = ['tile 1x2', 'slope 45', 'plate 2x4', 'technic beam', 'brick 1x1', 'hinge',
+                   'wedge plate', 'bracket 1x2', 'round tile', 'arch', 'window', 'axle']
+
+
+def bench_planner(args):
+    with open(args.index, 'r') as f:
+        search_index = json.load(f)
+    parts = search_index['parts']
+    stats = build_category_stats(parts, search_index['categories'])
+    index = build_inverted_index(parts, part_tokens=lambda part: expand_tokens(part['name']))
+
+    print(f"{'query':14} {'hits':>5} {'candidates':>10}  categories")
+    planned = []
+    for query in PLANNER_QUERIES:
+        hits, categories, candidates = planned_search(stats, index, query)
+        # Planning may only narrow the work, never the results
+        assert hits == lookup(index, query), query
+        if categories:
+            planned.append(candidates)
+        names = ', '.join(categories) if categories else 'global'
+        print(f"{query:14} {len(hits):5} {candidates:10}  {names}")
+
+    average = sum(planned) / len(planned) if planned else len(parts)
+    print(f"{len(planned)} of {len(PLANNER_QUERIES)} queries planned, examining {average:.0f} of "
+          f"{len(parts)} parts on average ({len(parts) / average:.0f}x fewer)")
+
+    with_plan = time_per_query(lambda q: planned_search(stats, index, q), PLANNER_QUERIES, args.repeat)
+    without = time_per_query(lambda q: lookup(index, q), PLANNER_QUERIES, args.repeat)
+    print(f"Planned search:       {with_plan * 1e6:9.1f} us/query ({with_plan / without:.1f}x global)")
+    print(f"Global posting lookup:{without * 1e6:9.1f} us/query")
+
+
+# Keystrokes mixing words, sizes and part numbers
+COMPLETION_QUERIES = ['br', 'technic br', 'tile 2x', '1 x 2 pl', 'plate 2 x', 'brick 300', '3001 br',
+                      '3023 pl', 'slope 3', '32 tech', 'axle 3', '2x4 30']
+
+
+def bench_completions(args):
+    parts = load_parts(args.index)
+    completions = build_completions(parts, compute_popularity())
+    index = build_inverted_index(parts, part_tokens=lambda part: expand_tokens(part['name']))
+
+    # The index may only narrow the scan, never change its results
+    for query in COMPLETION_QUERIES:
+        assert complete(completions, parts, query, index) == complete(completions, parts, query), query
+
+    indexed = time_per_query(lambda q: complete(completions, parts, q, index), COMPLETION_QUERIES, args.repeat)
+    scanned = time_per_query(lambda q: complete(completions, parts, q), COMPLETION_QUERIES, args.repeat)
+
+    print(f"Prefixes: {len(completions)}")
+    for query in COMPLETION_QUERIES:
+        names = [parts[o]['id'] for o in complete(completions, parts, query, index)]
+        print(f"  {query!r:14} {len(names):3}  {', '.join(names[:5])}")
+    print(f"With inverted index:  {indexed * 1e6:9.1f} us/query")
+    print(f"Popularity scan:      {scanned * 1e6:9.1f} us/query ({scanned / indexed:.1f}x slower)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search index structures')
+    parser.add_argument('--index', default=INDEX_PATH, help='Path to search_index.json')
+    parser.add_argument('--binary', default=BINARY_PATH, help='Path to search_index.bin')
+    parser.add_argument('--repeat', type=int, default=20, help='Times to run each query set')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    subparsers.add_parser('inverted', help='Inverted index lookups vs a linear scan').set_defaults(func=bench_inverted)
+    subparsers.add_parser('binary', help='Opening the mapped binary index vs loading JSON').set_defaults(func=bench_binary)
+    subparsers.add_parser('schema', help='Size and parse time of schema v1 vs v2').set_defaults(func=bench_schema)
+    subparsers.add_parser('spelling', help='Symmetric delete suggestions vs brute-force Levenshtein').set_defaults(func=bench_spelling)
+    subparsers.add_parser('completions', help='Autocomplete with and without the inverted index').set_defaults(func=bench_completions)
+    subparsers.add_parser('planner', help='Candidate set sizes and timings with category-intent planning').set_defaults(func=bench_planner)
+    stream = subparsers.add_parser('stream', help='Peak memory of streaming vs in-memory index writes')
+    stream.add_argument('--scale', type=int, default=20, help='How many copies of ba_parts.csv to index')
+    stream.set_defaults(func=bench_stream)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Compact binary search index that can be memory-mapped and queried in place.
+
+All integers are little-endian unsigned 32-bit values and every section starts
+on a 4-byte boundary, so each array section can be viewed as a memoryview of
+uint32 without copying. Layout:
+
+    header      magic, format version, flags, then (offset, count) for each section
+    str_offsets string table offsets, count = number of strings + 1
+    str_blob    UTF-8 bytes of every string, sorted by their encoded bytes
+    parts       (id, name, normalized_name) string ids and a category ordinal
+    categories  (id, name) string ids and a parent category ordinal
+    part_ids    (id string id, part ordinal) sorted by string id
+    tokens      (token string id, postings offset, postings count) sorted by string id
+    prefixes    same as tokens, for token prefixes
+    postings    part ordinals for every token and prefix, each list sorted
+
+Missing category or parent references are stored as NONE. The EXPANDED flag
+marks postings built with synonym expansion, whose queries are canonicalized
+with synonyms.query_tokens.
+"""
+import mmap
+import struct
+import sys
+
+from inverted_index import build_inverted_index, intersect
+from search_text import tokenize
+from synonyms import query_tokens
+
+MAGIC = b'LGSI'
+FORMAT_VERSION = 2
+NONE = 0xFFFFFFFF
+EXPANDED = 0x1
+
+SECTIONS = ['str_offsets', 'str_blob', 'parts', 'categories', 'part_ids', 'tokens', 'prefixes', 'postings']
+HEADER = struct.Struct('<4sII' + 'II' * len(SECTIONS))
+
+# Number of uint32 fields in each fixed-width record
+PART_FIELDS = 4
+CATEGORY_FIELDS = 3
+PART_ID_FIELDS = 2
+TERM_FIELDS = 3
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+def _uint32_array(values):
+    return struct.pack(f'<{len(values)}I', *values)
+
+
+def write_binary_index(path, parts, categories, index=None):
+    """Write parts, categories (list of dicts with full_path) and postings to path"""
+    if index is None:
+        index = build_inverted_index(parts)
+
+    strings = set()
+    for part in parts:
+        strings.update((part['id'], part['name'], part['normalized_name']))
+    for category in categories:
+        strings.update((category['id'], category['name']))
+    strings.update(index['tokens'])
+    strings.update(index['prefixes'])
+
+    # Sorting by encoded bytes lets the reader binary search the raw blob
+    encoded = sorted(s.encode('utf-8') for s in strings)
+    string_ids = {s.decode('utf-8'): sid for sid, s in enumerate(encoded)}
+
+    str_offsets = [0]
+    for s in encoded:
+        str_offsets.append(str_offsets[-1] + len(s))
+
+    category_ordinals = {category['id']: ordinal for ordinal, category in enumerate(categories)}
+
+    part_records = []
+    for part in parts:
+        part_records.extend((
+            string_ids[part['id']],
+            string_ids[part['name']],
+            string_ids[part['normalized_name']],
+            category_ordinals.get(part['category_id'], NONE)
+        ))
+
+    category_records = []
+    for category in categories:
+        category_records.extend((
+            string_ids[category['id']],
+            string_ids[category['name']],
+            category_ordinals.get(category['parent_id'], NONE)
+        ))
+
+    part_ids = []
+    for sid, ordinal in sorted((string_ids[part['id']], ordinal) for ordinal, part in enumerate(parts)):
+        part_ids.extend((sid, ordinal))
+
+    postings = []
+
+    def term_table(table):
+        records = []
+        for sid, term in sorted((string_ids[term], term) for term in table):
+            records.extend((sid, len(postings), len(table[term])))
+            postings.extend(table[term])
+        return records
+
+    token_records = term_table(index['tokens'])
+    prefix_records = term_table(index['prefixes'])
+
+    sections = {
+        'str_offsets': (_uint32_array(str_offsets), len(str_offsets)),
+        'str_blob': (_pad(b''.join(encoded)), str_offsets[-1]),
+        'parts': (_uint32_array(part_records), len(parts)),
+        'categories': (_uint32_array(category_records), len(categories)),
+        'part_ids': (_uint32_array(part_ids), len(parts)),
+        'tokens': (_uint32_array(token_records), len(index['tokens'])),
+        'prefixes': (_uint32_array(prefix_records), len(index['prefixes'])),
+        'postings': (_uint32_array(postings), len(postings))
+    }
+
+    header_fields = []
+    offset = HEADER.size
+    for name in SECTIONS:
+        data, count = sections[name]
+        header_fields.extend((offset, count))
+        offset += len(data)
+
+    with open(path, 'wb') as f:
+        flags = EXPANDED if index.get('expanded') else 0
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, *header_fields))
+        for name in SECTIONS:
+            f.write(sections[name][0])
+
+    return offset
+
+
+class BinarySearchIndex:
+    """
+    Read-only view over a binary index file. Nothing is parsed up front: every
+    lookup reads straight from the mapped pages, which the OS shares between
+    processes that open the same file.
+    """
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise RuntimeError('BinarySearchIndex requires a little-endian host')
+
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        fields = HEADER.unpack_from(self._buffer, 0)
+        if fields[0] != MAGIC or fields[1] != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} binary search index")
+
+        self.expanded = bool(fields[2] & EXPANDED)
+        self._sections = {}
+        for i, name in enumerate(SECTIONS):
+            self._sections[name] = (fields[3 + i * 2], fields[4 + i * 2])
+
+        self._str_offsets = self._uint32_view('str_offsets', 1)
+        blob_offset, blob_size = self._sections['str_blob']
+        self._str_blob = self._buffer[blob_offset:blob_offset + blob_size]
+        self._parts = self._uint32_view('parts', PART_FIELDS)
+        self._categories = self._uint32_view('categories', CATEGORY_FIELDS)
+        self._part_ids = self._uint32_view('part_ids', PART_ID_FIELDS)
+        self._tokens = self._uint32_view('tokens', TERM_FIELDS)
+        self._prefixes = self._uint32_view('prefixes', TERM_FIELDS)
+        self._postings = self._uint32_view('postings', 1)
+
+        self.part_count = self._sections['parts'][1]
+        self.category_count = self._sections['categories'][1]
+
+    def _uint32_view(self, name, fields):
+        offset, count = self._sections[name]
+        return self._buffer[offset:offset + count * fields * 4].cast('I')
+
+    def close(self):
+        # Views must be released before the map can be closed
+        for name in ('_str_offsets', '_str_blob', '_parts', '_categories', '_part_ids',
+                     '_tokens', '_prefixes', '_postings', '_buffer'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # String table
+
+    def _string_bytes(self, sid):
+        return self._str_blob[self._str_offsets[sid]:self._str_offsets[sid + 1]]
+
+    def string(self, sid):
+        return str(self._string_bytes(sid), 'utf-8')
+
+    def find_string(self, text):
+        """Return the string id of text, or None if it is not in the table"""
+        key = text.encode('utf-8')
+        lo, hi = 0, self._sections['str_offsets'][1] - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # memoryviews only support equality, so copy the few bytes compared
+            if bytes(self._string_bytes(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._sections['str_offsets'][1] - 1 and self._string_bytes(lo) == key:
+            return lo
+        return None
+
+    def _find_record(self, records, fields, sid):
+        """Binary search fixed-width records whose first field is a string id"""
+        lo, hi = 0, len(records) // fields
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if records[mid * fields] < sid:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(records) // fields and records[lo * fields] == sid:
+            return lo
+        return None
+
+    # Parts and categories
+
+    def find_part(self, part_number):
+        """Return the ordinal of part_number, or None"""
+        sid = self.find_string(part_number)
+        if sid is None:
+            return None
+        record = self._find_record(self._part_ids, PART_ID_FIELDS, sid)
+        if record is None:
+            return None
+        return self._part_ids[record * PART_ID_FIELDS + 1]
+
+    def part_number(self, ordinal):
+        return self.string(self._parts[ordinal * PART_FIELDS])
+
+    def part_name(self, ordinal):
+        return self.string(self._parts[ordinal * PART_FIELDS + 1])
+
+    def part_normalized_name(self, ordinal):
+        return self.string(self._parts[ordinal * PART_FIELDS + 2])
+
+    def part_category(self, ordinal):
+        """Return the category ordinal of a part, or None when it is unknown"""
+        category = self._parts[ordinal * PART_FIELDS + 3]
+        return None if category == NONE else category
+
+    def category_id(self, category):
+        return self.string(self._categories[category * CATEGORY_FIELDS])
+
+    def category_name(self, category):
+        return self.string(self._categories[category * CATEGORY_FIELDS + 1])
+
+    def category_parent(self, category):
+        parent = self._categories[category * CATEGORY_FIELDS + 2]
+        return None if parent == NONE else parent
+
+    def category_path(self, category):
+        path = []
+        while category is not None:
+            path.insert(0, self.category_name(category))
+            category = self.category_parent(category)
+        return path
+
+    # Postings
+
+    def postings(self, term, prefix=True):
+        """Return the sorted part ordinals for a term as a zero-copy view"""
+        records = self._prefixes if prefix else self._tokens
+        sid = self.find_string(term)
+        if sid is None:
+            return self._postings[0:0]
+        record = self._find_record(records, TERM_FIELDS, sid)
+        if record is None:
+            return self._postings[0:0]
+        start = records[record * TERM_FIELDS + 1]
+        return self._postings[start:start + records[record * TERM_FIELDS + 2]]
+
+    def lookup(self, query, prefix=True):
+        """Return the sorted ordinals of parts matching every token in query"""
+        tokens = query_tokens(query) if self.expanded else tokenize(query)
+        postings = [self.postings(token, prefix) for token in set(tokens)]
+        if not postings:
+            return []
+        postings.sort(key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            result = intersect(result, other)
+            if not result:
+                break
+        return list(result)
@@ -0,0 +1,189 @@
+"""
+Ancestor/descendant closure of the BrickArchitect category tree.
+
+ba_category_closure holds one row per (ancestor_id, descendant_id) pair,
+including each category paired with itself at depth 0, so "category X and
+all its subcategories" is a single indexed lookup:
+
+    SELECT p.* FROM parts p
+    JOIN ba_category_closure cc ON cc.descendant_id = p.ba_cat_id
+    WHERE cc.ancestor_id = ?
+
+The closure is rebuilt whenever ba_categories.csv is imported, and triggers
+on ba_categories keep it consistent with inserts, deletes and parent changes
+made by other tools. A parent that is missing or 0 ends the chain, the same
+way the search index treats dangling parents.
+"""
+import csv
+
+CATEGORIES_CSV = 'data/ba_categories.csv'
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ba_category_closure (
+        ancestor_id INTEGER NOT NULL,
+        descendant_id INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor_id, descendant_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ba_category_closure_descendant ON ba_category_closure(descendant_id, depth)",
+    # Link the new category below its parent's ancestors, and adopt any
+    # children that were inserted before it
+    """
+    CREATE TRIGGER IF NOT EXISTS ba_categories_closure_insert AFTER INSERT ON ba_categories
+    BEGIN
+        INSERT OR IGNORE INTO ba_category_closure (ancestor_id, descendant_id, depth)
+        SELECT NEW.id, NEW.id, 0
+        UNION ALL
+        SELECT ancestor_id, NEW.id, depth + 1 FROM ba_category_closure WHERE descendant_id = NEW.parent_id;
+
+        INSERT OR IGNORE INTO ba_category_closure (ancestor_id, descendant_id, depth)
+        SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+        FROM ba_categories child
+        JOIN ba_category_closure d ON d.ancestor_id = child.id
+        JOIN ba_category_closure a ON a.descendant_id = NEW.id
+        WHERE child.parent_id = NEW.id AND child.id != NEW.id;
+    END
+    """,
+    # Detach the subtree from the old ancestors and attach it below the new parent
+    """
+    CREATE TRIGGER IF NOT EXISTS ba_categories_closure_move AFTER UPDATE OF parent_id ON ba_categories
+    WHEN OLD.parent_id IS NOT NEW.parent_id
+    BEGIN
+        DELETE FROM ba_category_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM ba_category_closure WHERE ancestor_id = NEW.id)
+          AND ancestor_id IN (SELECT ancestor_id FROM ba_category_closure
+                              WHERE descendant_id = NEW.id AND ancestor_id != NEW.id);
+
+        INSERT OR IGNORE INTO ba_category_closure (ancestor_id, descendant_id, depth)
+        SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+        FROM ba_category_closure a
+        JOIN ba_category_closure d ON d.ancestor_id = NEW.id
+        WHERE a.descendant_id = NEW.parent_id;
+    END
+    """,
+    # Children of a deleted category keep their subtree but lose everything above it
+    """
+    CREATE TRIGGER IF NOT EXISTS ba_categories_closure_delete AFTER DELETE ON ba_categories
+    BEGIN
+        DELETE FROM ba_category_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM ba_category_closure WHERE ancestor_id = OLD.id)
+          AND ancestor_id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = OLD.id);
+    END
+    """
+]
+
+
+def parse_category_id(value):
+    """Return a category id as an int, or None for an empty or 0 parent"""
+    if value in (None, '', 0, '0'):
+        return None
+    return int(value)
+
+
+def read_category_parents(path=CATEGORIES_CSV):
+    """Return ({id: name}, {id: parent_id or None}) from ba_categories.csv"""
+    names = {}
+    parents = {}
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            cat_id = int(row['id'])
+            names[cat_id] = row['name']
+            parents[cat_id] = parse_category_id(row['parent_id'])
+    return names, parents
+
+
+def closure_rows(parents):
+    """
+    Return (ancestor_id, descendant_id, depth) for every category in
+    parents ({id: parent_id or None}). Each category is walked once; its
+    ancestors come from its parent's already computed chain.
+    """
+    chains = {}
+
+    def chain(cat_id):
+        # Iterative so deep or cyclic trees can't exhaust the stack
+        path = []
+        current = cat_id
+        while current in parents and current not in chains and current not in path:
+            path.append(current)
+            current = parents[current]
+        above = chains.get(current, [])
+        for node in reversed(path):
+            above = [node] + above
+            chains[node] = above
+        return chains[cat_id]
+
+    rows = []
+    for cat_id in parents:
+        for depth, ancestor_id in enumerate(chain(cat_id)):
+            rows.append((ancestor_id, cat_id, depth))
+    return rows
+
+
+def category_depths(parents):
+    """Return {id: depth} where top-level categories have depth 0"""
+    depths = {}
+    for _, descendant_id, depth in closure_rows(parents):
+        depths[descendant_id] = max(depth, depths.get(descendant_id, 0))
+    return depths
+
+
+def ensure_closure_table(conn):
+    """Create ba_categories if needed, plus the closure table, its index and triggers"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ba_categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            parent_id INTEGER,
+            parts_count INTEGER DEFAULT 0,
+            sort_order INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ba_categories_parent_id ON ba_categories(parent_id)")
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def rebuild_closure(conn):
+    """Recompute the whole closure from ba_categories; returns the number of rows"""
+    parents = {cat_id: parse_category_id(parent_id)
+               for cat_id, parent_id in conn.execute("SELECT id, parent_id FROM ba_categories")}
+    rows = closure_rows(parents)
+    conn.execute("DELETE FROM ba_category_closure")
+    conn.executemany("INSERT INTO ba_category_closure (ancestor_id, descendant_id, depth) VALUES (?, ?, ?)", rows)
+    return len(rows)
+
+
+def import_categories(conn, path=CATEGORIES_CSV):
+    """
+    Sync ba_categories with the CSV (insert new ids, update names and
+    parents, delete ids that are gone) and rebuild the closure. Other
+    columns such as sort_order and parts_count are left alone. Returns
+    (inserted, updated, deleted).
+    """
+    names, parents = read_category_parents(path)
+    existing = {cat_id: (name, parse_category_id(parent_id))
+                for cat_id, name, parent_id in conn.execute("SELECT id, name, parent_id FROM ba_categories")}
+
+    inserts = [(cat_id, names[cat_id], parents[cat_id]) for cat_id in names if cat_id not in existing]
+    updates = [(names[cat_id], parents[cat_id], cat_id) for cat_id in names
+               if cat_id in existing and existing[cat_id] != (names[cat_id], parents[cat_id])]
+    deletes = [(cat_id,) for cat_id in existing if cat_id not in names]
+
+    conn.executemany("INSERT INTO ba_categories (id, name, parent_id) VALUES (?, ?, ?)", inserts)
+    conn.executemany("UPDATE ba_categories SET name = ?, parent_id = ? WHERE id = ?", updates)
+    conn.executemany("DELETE FROM ba_categories WHERE id = ?", deletes)
+
+    # The triggers follow row by row; a full rebuild afterwards is cheap and
+    # doesn't depend on the order the CSV lists parents and children
+    rebuild_closure(conn)
+    return len(inserts), len(updates), len(deletes)
+
+
+def subtree_ids(conn, cat_id):
+    """Return cat_id and all its subcategory ids"""
+    rows = conn.execute("SELECT descendant_id FROM ba_category_closure WHERE ancestor_id = ? ORDER BY depth, descendant_id",
+                        (cat_id,))
+    return [row[0] for row in rows]
@@ -0,0 +1,127 @@
+"""
+Direct and subtree part counts per BrickArchitect category.
+
+ba_categories.direct_parts_count counts parts whose ba_cat_id is the
+category itself and ba_categories.parts_count (the column the web app
+already reads) counts the whole subtree. Both are computed in one pass over
+the category closure, then kept current by triggers: a part that gains,
+loses or changes its ba_cat_id adjusts its category and that category's
+ancestors by one, and a category that is added, moves or disappears shifts
+its subtree count between the old and new ancestors. No full rescan is needed
+after the initial refresh.
+"""
+from collections import Counter
+
+from category_closure import closure_rows, parse_category_id
+
+SCHEMA = [
+    """
+    CREATE TRIGGER IF NOT EXISTS parts_rollup_insert AFTER INSERT ON parts
+    WHEN NEW.ba_cat_id IS NOT NULL
+    BEGIN
+        UPDATE ba_categories SET direct_parts_count = direct_parts_count + 1 WHERE id = NEW.ba_cat_id;
+        UPDATE ba_categories SET parts_count = parts_count + 1
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = NEW.ba_cat_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS parts_rollup_delete AFTER DELETE ON parts
+    WHEN OLD.ba_cat_id IS NOT NULL
+    BEGIN
+        UPDATE ba_categories SET direct_parts_count = direct_parts_count - 1 WHERE id = OLD.ba_cat_id;
+        UPDATE ba_categories SET parts_count = parts_count - 1
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = OLD.ba_cat_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS parts_rollup_update AFTER UPDATE OF ba_cat_id ON parts
+    WHEN OLD.ba_cat_id IS NOT NEW.ba_cat_id
+    BEGIN
+        UPDATE ba_categories SET direct_parts_count = direct_parts_count - 1 WHERE id = OLD.ba_cat_id;
+        UPDATE ba_categories SET parts_count = parts_count - 1
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = OLD.ba_cat_id);
+        UPDATE ba_categories SET direct_parts_count = direct_parts_count + 1 WHERE id = NEW.ba_cat_id;
+        UPDATE ba_categories SET parts_count = parts_count + 1
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = NEW.ba_cat_id);
+    END
+    """,
+    # The ancestors of the old and new parents are outside the moved subtree,
+    # so these don't depend on whether the closure triggers ran first
+    """
+    CREATE TRIGGER IF NOT EXISTS ba_categories_rollup_move AFTER UPDATE OF parent_id ON ba_categories
+    WHEN OLD.parent_id IS NOT NEW.parent_id
+    BEGIN
+        UPDATE ba_categories SET parts_count = parts_count - NEW.parts_count
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = OLD.parent_id);
+        UPDATE ba_categories SET parts_count = parts_count + NEW.parts_count
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = NEW.parent_id);
+    END
+    """,
+    # A new category may adopt parts and children that already exist. Its counts
+    # come from parts and its children's closure rows, and its ancestors are
+    # above it, so this doesn't depend on whether the closure trigger ran first
+    """
+    CREATE TRIGGER IF NOT EXISTS ba_categories_rollup_insert AFTER INSERT ON ba_categories
+    BEGIN
+        UPDATE ba_categories SET
+            direct_parts_count = (SELECT COUNT(*) FROM parts WHERE ba_cat_id = NEW.id),
+            parts_count = (SELECT COUNT(*) FROM parts WHERE ba_cat_id = NEW.id)
+                + (SELECT COUNT(*) FROM parts p
+                   JOIN ba_category_closure d ON d.descendant_id = p.ba_cat_id
+                   JOIN ba_categories child ON child.id = d.ancestor_id
+                   WHERE child.parent_id = NEW.id AND child.id != NEW.id)
+        WHERE id = NEW.id;
+        UPDATE ba_categories SET parts_count = parts_count + (SELECT parts_count FROM ba_categories WHERE id = NEW.id)
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = NEW.parent_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ba_categories_rollup_delete AFTER DELETE ON ba_categories
+    BEGIN
+        UPDATE ba_categories SET parts_count = parts_count - OLD.parts_count
+        WHERE id IN (SELECT ancestor_id FROM ba_category_closure WHERE descendant_id = OLD.parent_id);
+    END
+    """
+]
+
+
+def compute_rollups(parents, direct_counts):
+    """
+    Return {id: (direct, subtree)} for every category in parents
+    ({id: parent_id or None}) given {id: number of parts directly in it}.
+    Each closure row adds its descendant's direct count to its ancestor once.
+    """
+    subtree = Counter()
+    for ancestor_id, descendant_id, _ in closure_rows(parents):
+        subtree[ancestor_id] += direct_counts.get(descendant_id, 0)
+    return {cat_id: (direct_counts.get(cat_id, 0), subtree[cat_id]) for cat_id in parents}
+
+
+def ensure_rollup_columns(conn):
+    """Add the count columns and the triggers that keep them current"""
+    column_names = [column[1] for column in conn.execute("PRAGMA table_info(ba_categories)")]
+    for column in ('direct_parts_count', 'parts_count'):
+        if column not in column_names:
+            conn.execute(f"ALTER TABLE ba_categories ADD COLUMN {column} INTEGER DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_parts_ba_cat_id ON parts(ba_cat_id)")
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def refresh_rollups(conn):
+    """Recompute every category's counts from scratch; returns the number of categories changed"""
+    parents = {}
+    current = {}
+    for cat_id, parent_id, direct, subtree in conn.execute(
+            "SELECT id, parent_id, direct_parts_count, parts_count FROM ba_categories"):
+        parents[cat_id] = parse_category_id(parent_id)
+        current[cat_id] = (direct, subtree)
+
+    direct_counts = dict(conn.execute(
+        "SELECT ba_cat_id, COUNT(*) FROM parts WHERE ba_cat_id IS NOT NULL GROUP BY ba_cat_id"))
+
+    updates = [(direct, subtree, cat_id)
+               for cat_id, (direct, subtree) in compute_rollups(parents, direct_counts).items()
+               if current[cat_id] != (direct, subtree)]
+    conn.executemany("UPDATE ba_categories SET direct_parts_count = ?, parts_count = ? WHERE id = ?", updates)
+    return len(updates)
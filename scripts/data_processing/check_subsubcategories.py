@@ -1,35 +1,23 @@
-import csv
+from category_closure import category_depths, read_category_parents
 
 # Read categories data
-with open('data/ba_categories.csv', 'r') as f:
-    reader = csv.reader(f)
-    next(reader)  # Skip header
+names, parents = read_category_parents('data/ba_categories.csv')
 
-    # Store categories by ID
-    categories = {}
-    for row in reader:
-        cat_id = row[0]
-        cat_name = row[1]
-        parent_id = row[2]
-        categories[cat_id] = {
-            'name': cat_name,
-            'parent_id': parent_id
-        }
+# Find subsubcategories (entries at depth 2 or more in the category tree)
+depths = category_depths(parents)
+subsubcategories = []
+for cat_id, name in names.items():
+    if depths[cat_id] >= 2:
+        parent_id = parents[cat_id]
+        subsubcategories.append({
+            'id': cat_id,
+            'name': name,
+            'parent_id': parent_id,
+            'parent_name': names[parent_id]
+        })
 
-    # Find subsubcategories (entries whose parent is not a top-level category)
-    subsubcategories = []
-    for cat_id, cat_data in categories.items():
-        parent_id = cat_data['parent_id']
-        if parent_id and parent_id in categories and categories[parent_id]['parent_id'] != '':
-            subsubcategories.append({
-                'id': cat_id,
-                'name': cat_data['name'],
-                'parent_id': parent_id,
-                'parent_name': categories[parent_id]['name']
-            })
-
-    # Print the first 10 subsubcategories
-    print(f"Found {len(subsubcategories)} subsubcategories")
-    print("\nFirst 10 subsubcategories:")
-    for i, subcat in enumerate(subsubcategories[:10]):
-        print(f"{subcat['id']}: {subcat['name']} (parent: {subcat['parent_id']} - {subcat['parent_name']})")
\ No newline at end of file
+# Print the first 10 subsubcategories
+print(f"Found {len(subsubcategories)} subsubcategories")
+print("\nFirst 10 subsubcategories:")
+for i, subcat in enumerate(subsubcategories[:10]):
+    print(f"{subcat['id']}: {subcat['name']} (parent: {subcat['parent_id']} - {subcat['parent_name']})")
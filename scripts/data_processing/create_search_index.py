@@ -1,77 +1,129 @@
+#!/usr/bin/env python3
+import argparse
 import csv
+import hashlib
 import json
 import os
-import re
 
-# Function to clean and normalize part names
-def normalize_text(text):
-    # Convert to lowercase
-    text = text.lower()
+from autocomplete import COLORS_CSV, ELEMENTS_CSV, build_completions, compute_popularity
+from binary_index import write_binary_index
+from dimensions import build_dimension_section
+from inverted_index import build_inverted_index
+from label_filter import (DEFAULT_FP_RATE, LABEL_FILTER_PATH, build_label_filter, load_labelled_parts,
+                          write_label_filter)
+from publish_artifacts import POINTER_NAME, PUBLISH_DIR, publish
+from query_planner import build_category_stats
+from search_index_shards import MANIFEST_NAME, SHARD_DIR, SHARD_PREFIX, build_shards, write_shards
+from search_index_v2 import build_v2, write_v2
+from search_text import normalize_text
+from spelling import SPELLING_PATH, build_dictionary, build_vocabulary, write_dictionary
+from synonyms import DB_PATH, expand_tokens, load_rebrickable_names
 
-    # Remove any special characters and extra whitespace
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
+PARTS_CSV = 'data/ba_parts.csv'
+CATEGORIES_CSV = 'data/ba_categories.csv'
+INDEX_PATH = 'data/search_index.json'
+DELTA_PATH = 'data/search_index.delta.json'
+STATE_PATH = 'data/search_index.state.json'
+NDJSON_PATH = 'data/search_index.ndjson'
+V2_PATH = 'data/search_index.v2.json'
+BINARY_PATH = 'data/search_index.bin'
 
-    return text
+# Sections computed from the whole parts list, keyed by part ordinal
+DERIVED_SECTIONS = ['index', 'completions', 'dimensions', 'category_stats']
+# Options that need every part in memory, so --stream can't be combined with them
+IN_MEMORY_OPTIONS = ('incremental', 'inverted_index', 'synonyms', 'autocomplete', 'dimensions', 'category_stats',
+                     'spelling', 'label_filter', 'binary', 'v2', 'shards')
 
-# Create data directory if it doesn't exist
-os.makedirs('data', exist_ok=True)
 
-# Load parts data
-parts = []
-with open('data/ba_parts.csv', 'r') as f:
-    reader = csv.reader(f)
-    header = next(reader)
+# Hash helpers used by the incremental mode
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    for row in reader:
-        part_number = row[0]
-        part_name = row[1]
-        category_id = row[2]
 
-        # Skip parts with missing information
-        if not part_number or not part_name:
-            continue
-
-        parts.append({
-            'id': part_number,
-            'name': part_name,
-            'normalized_name': normalize_text(part_name),
-            'category_id': category_id
-        })
-
-# Load categories data
-categories = {}
-with open('data/ba_categories.csv', 'r') as f:
-    reader = csv.reader(f)
-    next(reader)  # Skip header
-
-    for row in reader:
-        cat_id = row[0]
-        cat_name = row[1]
-        parent_id = row[2]
-
-        categories[cat_id] = {
-            'id': cat_id,
-            'name': cat_name,
-            'parent_id': parent_id
-        }
-
-# Create a hierarchical structure of categories
-for cat_id, cat_data in categories.items():
-    # Add full_path to track the hierarchy (for display and searching)
-    cat_data['full_path'] = []
+def hash_record(record):
+    encoded = json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def iter_part_rows(path=PARTS_CSV):
+    """Yield (part_number, part_name, category_id) rows one at a time"""
+    with open(path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header
+
+        for row in reader:
+            part_number = row[0]
+            part_name = row[1]
+            category_id = row[2]
+
+            # Skip parts with missing information
+            if not part_number or not part_name:
+                continue
+
+            yield (part_number, part_name, category_id)
+
+
+def read_part_rows(path=PARTS_CSV):
+    """Read part rows keyed by part number, in file order"""
+    return {row[0]: row for row in iter_part_rows(path)}
+
 
-    # Start with the current category
+def read_category_rows(path=CATEGORIES_CSV):
+    """Read category rows keyed by category id, in file order"""
+    rows = {}
+    with open(path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header
+
+        for row in reader:
+            rows[row[0]] = (row[0], row[1], row[2])
+    return rows
+
+
+def build_part(row):
+    part_number, part_name, category_id = row
+    return {
+        'id': part_number,
+        'name': part_name,
+        'normalized_name': normalize_text(part_name),
+        'category_id': category_id
+    }
+
+
+def build_category(row):
+    cat_id, cat_name, parent_id = row
+    return {
+        'id': cat_id,
+        'name': cat_name,
+        'parent_id': parent_id
+    }
+
+
+def category_chain(categories, cat_id):
+    """Return the ids from the root category down to cat_id"""
+    chain = [cat_id]
     current_id = cat_id
-    cat_data['full_path'].insert(0, categories[current_id]['name'])
 
     # Walk up the parent chain
     while categories[current_id]['parent_id'] and categories[current_id]['parent_id'] in categories:
         current_id = categories[current_id]['parent_id']
-        cat_data['full_path'].insert(0, categories[current_id]['name'])
+        chain.append(current_id)
+
+    chain.reverse()
+    return chain
+
 
-# Enrich parts with category information
-for part in parts:
+def add_full_path(categories, cat_id):
+    # Add full_path to track the hierarchy (for display and searching)
+    chain = category_chain(categories, cat_id)
+    categories[cat_id]['full_path'] = [categories[c]['name'] for c in chain]
+
+
+def enrich_part(part, categories):
     cat_id = part['category_id']
     if cat_id in categories:
         part['category_name'] = categories[cat_id]['name']
@@ -80,16 +132,350 @@ for part in parts:
         # If category doesn't exist, provide defaults
         part['category_name'] = 'Unknown'
         part['category_path'] = ['Unknown']
+    return part
+
+
+def write_json(path, data, indent=2):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=indent)
+
+
+def build_categories(category_rows):
+    categories = {cat_id: build_category(row) for cat_id, row in category_rows.items()}
+
+    # Create a hierarchical structure of categories
+    for cat_id in categories:
+        add_full_path(categories, cat_id)
+    return categories
+
+
+def iter_parts(categories, path=PARTS_CSV):
+    """Read, build and enrich parts lazily so only one part is held at a time"""
+    for row in iter_part_rows(path):
+        yield enrich_part(build_part(row), categories)
+
+
+def write_stream(path, parts, categories, output_format):
+    """
+    Write parts from an iterator without ever holding the full list.
+    'ndjson' writes a {"categories": [...]} line followed by one part per line;
+    'json' writes the regular index layout minified.
+    Returns the number of parts written.
+    """
+    count = 0
+    tmp_path = path + '.tmp'
+    compact = {'separators': (',', ':')}
+
+    with open(tmp_path, 'w') as f:
+        if output_format == 'ndjson':
+            f.write(json.dumps({'categories': list(categories.values())}, **compact) + '\n')
+            for part in parts:
+                f.write(json.dumps(part, **compact) + '\n')
+                count += 1
+        else:
+            f.write('{"parts":[')
+            for part in parts:
+                if count:
+                    f.write(',')
+                f.write(json.dumps(part, **compact))
+                count += 1
+            f.write('],"categories":')
+            f.write(json.dumps(list(categories.values()), **compact))
+            f.write('}')
+
+    # Readers never see a half-written index
+    os.replace(tmp_path, path)
+    return count
+
+
+def build_full(part_rows, category_rows):
+    """Build every category and part record from scratch"""
+    categories = build_categories(category_rows)
+
+    # Enrich parts with category information
+    parts = [enrich_part(build_part(row), categories) for row in part_rows.values()]
+    return parts, categories
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def load_previous_index(path=INDEX_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def build_incremental(part_rows, category_rows, state, previous):
+    """
+    Rebuild only the records whose CSV row, or whose category's ancestor chain,
+    changed since the last run. Everything else is reused from the previous index.
+    """
+    old_part_rows = state['part_rows']
+    old_category_rows = state['category_rows']
+    prev_parts = {p['id']: p for p in previous['parts']}
+    prev_categories = {c['id']: c for c in previous['categories']}
+
+    category_row_hashes = {cat_id: hash_record(row) for cat_id, row in category_rows.items()}
+    changed_category_rows = {
+        cat_id for cat_id, row_hash in category_row_hashes.items()
+        if old_category_rows.get(cat_id) != row_hash
+    }
+    removed_category_rows = set(old_category_rows) - set(category_rows)
+
+    categories = {cat_id: build_category(row) for cat_id, row in category_rows.items()}
+
+    # A category is dirty when its own row or any row in its ancestor chain changed
+    dirty_categories = set()
+    for cat_id in categories:
+        chain = category_chain(categories, cat_id)
+        dangling_parent = categories[chain[0]]['parent_id']
+        if (any(c in changed_category_rows for c in chain)
+                or (dangling_parent and dangling_parent in removed_category_rows)
+                or cat_id not in prev_categories):
+            dirty_categories.add(cat_id)
+            add_full_path(categories, cat_id)
+        else:
+            categories[cat_id]['full_path'] = prev_categories[cat_id]['full_path']
+
+    parts = []
+    rebuilt = 0
+    for part_number, row in part_rows.items():
+        category_id = row[2]
+        if (old_part_rows.get(part_number) != hash_record(row)
+                or category_id in dirty_categories
+                or category_id in removed_category_rows
+                or part_number not in prev_parts):
+            parts.append(enrich_part(build_part(row), categories))
+            rebuilt += 1
+        else:
+            parts.append(prev_parts[part_number])
+
+    print(f"Recomputed {len(dirty_categories)} categories and {rebuilt} parts")
+    return parts, categories
+
+
+def diff_records(old_hashes, records):
+    """Return (upserted records, removed ids, new hashes) against the previous hashes"""
+    new_hashes = {}
+    upserted = []
+    for record in records:
+        record_hash = hash_record(record)
+        new_hashes[record['id']] = record_hash
+        if old_hashes.get(record['id']) != record_hash:
+            upserted.append(record)
+    removed = [record_id for record_id in old_hashes if record_id not in new_hashes]
+    return upserted, removed, new_hashes
+
+
+def write_delta(state, input_hashes, options, part_rows, category_rows, search_index):
+    """Write the delta against the previous version and the state for the next run"""
+    old_hashes = state or {'version': 0, 'parts': {}, 'categories': {}}
+    upserted_parts, removed_parts, part_hashes = diff_records(old_hashes['parts'], search_index['parts'])
+    upserted_categories, removed_categories, category_hashes = diff_records(
+        old_hashes['categories'], search_index['categories'])
+    version = old_hashes['version'] + 1
+    section_hashes = {key: hash_record(search_index[key]) for key in DERIVED_SECTIONS if key in search_index}
+
+    # The delta lets clients patch a cached copy of the previous version
+    delta = {
+        'from_version': old_hashes['version'],
+        'version': version,
+        'parts': {'upsert': upserted_parts, 'remove': removed_parts},
+        'categories': {'upsert': upserted_categories, 'remove': removed_categories}
+    }
+    # Ordinals shift when parts are added or removed, and any name change reaches most of a
+    # derived section, so derived sections aren't shipped: the delta names the stale ones and
+    # clients rebuild them from the patched parts (or re-read them from the full index)
+    delta['stale_sections'] = [key for key, section_hash in section_hashes.items()
+                               if section_hash != old_hashes.get('sections', {}).get(key)]
+    write_json(DELTA_PATH, delta)
+
+    write_json(STATE_PATH, {
+        'version': version,
+        'inputs': input_hashes,
+        'options': options,
+        'part_rows': {part_number: hash_record(row) for part_number, row in part_rows.items()},
+        'category_rows': {cat_id: hash_record(row) for cat_id, row in category_rows.items()},
+        'parts': part_hashes,
+        'categories': category_hashes,
+        'sections': section_hashes
+    }, indent=None)
+
+    print(f"Delta v{old_hashes['version']} -> v{version}: "
+          f"{len(upserted_parts)} parts upserted, {len(removed_parts)} removed, "
+          f"{len(upserted_categories)} categories upserted, {len(removed_categories)} removed"
+          + (f", stale sections: {', '.join(delta['stale_sections'])}" if delta['stale_sections'] else ''))
+    print(f"Saved to {DELTA_PATH}")
+
+
+def publish_outputs(written, out_dir, set_prefixes=()):
+    pointer = publish(written, out_dir, set_prefixes)
+    for name in map(os.path.basename, written):
+        entry = pointer[name]
+        print(f"Published {name} as {entry['file']} ({entry['bytes']} bytes, {entry['gzip_bytes']} gzipped)")
+    print(f"Pointer saved to {os.path.join(out_dir, POINTER_NAME)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create the BrickArchitect parts search index')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only recompute changed parts and categories and write a delta file')
+    parser.add_argument('--inverted-index', action='store_true',
+                        help='Include token and prefix posting lists keyed by part ordinal')
+    parser.add_argument('--synonyms', action='store_true',
+                        help='Index every part under dimension, alias and Rebrickable-name spellings of '
+                             'its tokens (implies --inverted-index)')
+    parser.add_argument('--autocomplete', action='store_true',
+                        help=f'Include top-N completions per prefix, ranked by popularity from {ELEMENTS_CSV}')
+    parser.add_argument('--dimensions', action='store_true',
+                        help='Include width/length/height parsed from part names, sorted for range lookups')
+    parser.add_argument('--category-stats', action='store_true',
+                        help='Include token-to-category frequencies for the category-intent query planner')
+    parser.add_argument('--spelling', action='store_true',
+                        help=f'Also write a symmetric-delete spelling dictionary to {SPELLING_PATH}')
+    parser.add_argument('--label-filter', nargs='?', type=float, const=DEFAULT_FP_RATE, metavar='FP_RATE',
+                        help=f'Also write a Bloom filter of part numbers with a label_file in {DB_PATH} to '
+                             f'{LABEL_FILTER_PATH} (default false-positive rate {DEFAULT_FP_RATE})')
+    parser.add_argument('--binary', action='store_true',
+                        help=f'Also write a memory-mappable binary index to {BINARY_PATH}')
+    parser.add_argument('--v2', action='store_true',
+                        help=f'Also write the minified schema v2 index with interned category paths to {V2_PATH}')
+    parser.add_argument('--shards', action='store_true',
+                        help=f'Also write one shard per top-level category and a manifest to {SHARD_DIR}')
+    parser.add_argument('--stream', choices=['ndjson', 'json'],
+                        help=f'Stream parts straight from the CSV with flat memory use, as NDJSON '
+                             f'({NDJSON_PATH}) or minified JSON ({INDEX_PATH})')
+    parser.add_argument('--publish', nargs='?', const=PUBLISH_DIR, metavar='DIR',
+                        help=f'Copy the generated files to DIR (default {PUBLISH_DIR}) under content-hashed '
+                             f'names with gzip -9 copies and a {POINTER_NAME}')
+    args = parser.parse_args()
+
+    if args.label_filter is not None and not 0 < args.label_filter < 1:
+        parser.error(f'--label-filter FP_RATE must be between 0 and 1 (exclusive), got {args.label_filter}')
+    if args.stream and any(getattr(args, option) for option in IN_MEMORY_OPTIONS):
+        parser.error('--stream cannot be combined with options that need every part in memory')
+
+    # Create data directory if it doesn't exist
+    os.makedirs('data', exist_ok=True)
+
+    if args.stream:
+        # Categories are small and needed to enrich every part, so only they are loaded up front
+        categories = build_categories(read_category_rows())
+        path = NDJSON_PATH if args.stream == 'ndjson' else INDEX_PATH
+        count = write_stream(path, iter_parts(categories), categories, args.stream)
+        print(f"Search index streamed with {count} parts and {len(categories)} categories")
+        print(f"Saved to {path}")
+        if args.publish:
+            publish_outputs([path], args.publish)
+        return
+
+    input_hashes = {PARTS_CSV: hash_file(PARTS_CSV), CATEGORIES_CSV: hash_file(CATEGORIES_CSV)}
+    if args.autocomplete:
+        input_hashes[ELEMENTS_CSV] = hash_file(ELEMENTS_CSV)
+        input_hashes[COLORS_CSV] = hash_file(COLORS_CSV)
+    if (args.synonyms or args.spelling or args.label_filter) and os.path.exists(DB_PATH):
+        input_hashes[DB_PATH] = hash_file(DB_PATH)
+    options = {
+        'inverted_index': args.inverted_index, 'synonyms': args.synonyms, 'autocomplete': args.autocomplete,
+        'dimensions': args.dimensions,
+        'category_stats': args.category_stats, 'spelling': args.spelling, 'label_filter': args.label_filter,
+        'binary': args.binary, 'v2': args.v2, 'shards': args.shards
+    }
+    state = load_state() if args.incremental else None
+    previous = load_previous_index() if state else None
+
+    if state and previous and state['inputs'] == input_hashes and state.get('options') == options:
+        print(f"Inputs unchanged since version {state['version']}, nothing to do")
+        return
+
+    part_rows = read_part_rows()
+    category_rows = read_category_rows()
+
+    if state and previous:
+        parts, categories = build_incremental(part_rows, category_rows, state, previous)
+    else:
+        parts, categories = build_full(part_rows, category_rows)
+
+    # Create search index
+    search_index = {
+        'parts': parts,
+        'categories': list(categories.values())
+    }
+    rebrickable_names = load_rebrickable_names() if args.synonyms or args.spelling else {}
+    if args.synonyms:
+        print(f"Expanding synonyms with {len(rebrickable_names)} Rebrickable names")
+        search_index['index'] = build_inverted_index(
+            parts, part_tokens=lambda part: expand_tokens(part['name'], [rebrickable_names.get(part['id'])]))
+    elif args.inverted_index:
+        search_index['index'] = build_inverted_index(parts)
+    if args.autocomplete:
+        search_index['completions'] = build_completions(parts, compute_popularity())
+    if args.dimensions:
+        search_index['dimensions'] = build_dimension_section(parts)
+    if args.category_stats:
+        search_index['category_stats'] = build_category_stats(parts, search_index['categories'])
+
+    # Save search index to JSON file
+    write_json(INDEX_PATH, search_index)
+    written = [INDEX_PATH]
+
+    print(f"Search index created with {len(parts)} parts and {len(categories)} categories")
+    print(f"Saved to {INDEX_PATH}")
+
+    if args.binary:
+        size = write_binary_index(BINARY_PATH, parts, search_index['categories'], search_index.get('index'))
+        written.append(BINARY_PATH)
+        print(f"Binary index ({size} bytes) saved to {BINARY_PATH}")
+
+    if args.v2:
+        document = build_v2(parts, search_index['categories'], search_index.get('index'))
+        for key in ('completions', 'dimensions', 'category_stats'):
+            if key in search_index:
+                document[key] = search_index[key]
+        write_v2(V2_PATH, document)
+        written.append(V2_PATH)
+        print(f"Schema v2 index ({os.path.getsize(V2_PATH)} bytes) saved to {V2_PATH}")
+
+    if args.spelling:
+        vocabulary = build_vocabulary(
+            [part['name'] for part in parts]
+            + [category['name'] for category in search_index['categories']]
+            + [rebrickable_names.get(part['id']) for part in parts])
+        write_dictionary(build_dictionary(vocabulary))
+        written.append(SPELLING_PATH)
+        print(f"Spelling dictionary with {len(vocabulary)} words saved to {SPELLING_PATH}")
+
+    if args.label_filter:
+        if os.path.exists(DB_PATH):
+            bloom = build_label_filter(load_labelled_parts(DB_PATH), args.label_filter)
+            write_label_filter(bloom)
+            written.append(LABEL_FILTER_PATH)
+            print(f"Label filter for {bloom.item_count} parts ({len(bloom.bits)} bytes, "
+                  f"{bloom.hash_count} hashes, ~{bloom.expected_fp_rate():.2%} false positives) "
+                  f"saved to {LABEL_FILTER_PATH}")
+        else:
+            print(f"Skipping label filter: {DB_PATH} not found")
+
+    if args.shards:
+        manifest, rewritten = write_shards(*build_shards(parts, search_index['categories']))
+        written += [os.path.join(SHARD_DIR, entry['file']) for entry in manifest['shards']]
+        written.append(os.path.join(SHARD_DIR, MANIFEST_NAME))
+        print(f"{len(manifest['shards'])} shards ({rewritten} changed) saved to {SHARD_DIR}")
+
+    if args.incremental:
+        write_delta(state, input_hashes, options, part_rows, category_rows, search_index)
+        written.append(DELTA_PATH)
 
-# Create search index
-search_index = {
-    'parts': parts,
-    'categories': list(categories.values())
-}
+    if args.publish:
+        # Shards of top-level categories that are gone drop out of the pointer
+        publish_outputs(written, args.publish, (SHARD_PREFIX,) if args.shards else ())
 
-# Save search index to JSON file
-with open('data/search_index.json', 'w') as f:
-    json.dump(search_index, f, indent=2)
 
-print(f"Search index created with {len(parts)} parts and {len(categories)} categories")
-print("Saved to data/search_index.json")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Structured stud dimensions parsed from part names.
+
+Names carry footprints such as "1×2 Brick", "2 x 4 Plate" or "1×1×⅔ Slope".
+The first dimension in a name is taken as the part's own size (later ones,
+as in "1×4 Bracket w/ 1×2 Plate", describe attached features). Width is the
+smaller of the first two numbers and length the larger, so "6×2" and "2×6"
+are the same footprint; height is only present for three-part dimensions
+and may be fractional.
+
+Dimension filters are dicts of {'width' | 'length' | 'height': (low, high)}
+with None for an open bound, answered either by SQL against the indexed
+dim_* columns of the parts table or by binary search over a search index
+section.
+"""
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+FRACTIONS = '⅓⅔½¼¾⅛⅖⅘⅚'
+NUMBER = rf'\d*[{FRACTIONS}]|\d+'
+DIMENSION_PATTERN = re.compile(rf'(\d+)\s*[x×]\s*(\d+)(?:\s*[x×]\s*({NUMBER}))?', re.IGNORECASE)
+
+# "2xN", "2×N N>=6", "2x6-10", "2 x 6+" or "1x2x5" (with height) in a search box
+QUERY_PATTERN = re.compile(
+    rf'(\d+)\s*[x×]\s*(n|\d+)(?:\s*[x×]\s*({NUMBER})|\s*-\s*(\d+)|\s*(\+))?(?![\w])', re.IGNORECASE)
+CONDITION_PATTERN = re.compile(r'\bn\s*(>=|<=|≥|≤|>|<|=)\s*(\d+)', re.IGNORECASE)
+
+FIELDS = ['width', 'length', 'height']
+
+
+def parse_number(text):
+    """Parse '3', '⅔' or '1⅓' as a number"""
+    whole = ''.join(c for c in text if c.isdigit())
+    value = int(whole) if whole else 0
+    for c in text:
+        if c in FRACTIONS:
+            return value + unicodedata.numeric(c)
+    return value
+
+
+def parse_dimensions(name):
+    """Return (width, length, height) for a part name, or None when it has no dimensions"""
+    if not name:
+        return None
+    match = DIMENSION_PATTERN.search(name)
+    if not match:
+        return None
+    first, second = int(match.group(1)), int(match.group(2))
+    height = parse_number(match.group(3)) if match.group(3) else None
+    return (min(first, second), max(first, second), height)
+
+
+def parse_dimension_query(text):
+    """
+    Split a query into a dimension filter and the remaining words.
+    "plate 2xN N>=6" gives ({'width': (2, 2), 'length': (6, None)}, 'plate').
+    "brick 1x2x5" gives ({'width': (1, 1), 'length': (2, 2), 'height': (5, 5)}, 'brick').
+    Returns (None, text) when the query has no dimension pattern.
+    """
+    match = QUERY_PATTERN.search(text)
+    if not match:
+        return None, text
+
+    first, second, height, upper, plus = match.groups()
+    remaining = text[:match.start()] + text[match.end():]
+    first = int(first)
+
+    if second.lower() == 'n':
+        low, high = None, None
+        for op, value in CONDITION_PATTERN.findall(remaining):
+            value = int(value)
+            if op in ('>=', '≥'):
+                low = value
+            elif op == '>':
+                low = value + 1
+            elif op in ('<=', '≤'):
+                high = value
+            elif op == '<':
+                high = value - 1
+            else:
+                low = high = value
+        remaining = CONDITION_PATTERN.sub('', remaining)
+        # "N" is the free side, so the footprint is first × N in either orientation
+        dimension_filter = {'sides': (first, low, high)}
+    else:
+        second = int(second)
+        high = int(upper) if upper else (None if plus else second)
+        if first <= second:
+            dimension_filter = {'width': (first, first), 'length': (second, high)}
+        else:
+            dimension_filter = {'sides': (first, second, high)}
+
+    if height:
+        height = parse_number(height)
+        dimension_filter['height'] = (height, height)
+
+    return dimension_filter, ' '.join(remaining.split())
+
+
+def _expand_sides(dimension_filter):
+    """
+    Turn {'sides': (fixed, low, high)} into plain width/length filters. A
+    footprint of fixed × n is stored as (fixed, n) when n >= fixed and as
+    (n, fixed) otherwise, so it becomes up to two filters.
+    """
+    if 'sides' not in dimension_filter:
+        return [dimension_filter]
+
+    fixed, low, high = dimension_filter['sides']
+    extra = {k: v for k, v in dimension_filter.items() if k != 'sides'}
+    filters = []
+    if high is None or high >= fixed:
+        filters.append({**extra, 'width': (fixed, fixed), 'length': (max(low or fixed, fixed), high)})
+    if low is None or low < fixed:
+        upper = fixed - 1 if high is None else min(high, fixed - 1)
+        filters.append({**extra, 'width': (low, upper), 'length': (fixed, fixed)})
+    return filters
+
+
+def matches(dimensions, dimension_filter):
+    if dimensions is None:
+        return False
+    for dimension_filter in _expand_sides(dimension_filter):
+        ok = True
+        for field, value in zip(FIELDS, dimensions):
+            if field not in dimension_filter:
+                continue
+            low, high = dimension_filter[field]
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                ok = False
+                break
+        if ok:
+            return True
+    return False
+
+
+def sql_dimension_clause(dimension_filter, alias='p'):
+    """Return (sql, params) for a WHERE clause that can use idx_parts_dimensions"""
+    clauses = []
+    params = []
+    for expanded in _expand_sides(dimension_filter):
+        parts = []
+        for field in FIELDS:
+            if field not in expanded:
+                continue
+            low, high = expanded[field]
+            column = f'{alias}.dim_{field}'
+            if low is not None and low == high:
+                parts.append(f'{column} = ?')
+                params.append(low)
+                continue
+            if low is not None:
+                parts.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                parts.append(f'{column} <= ?')
+                params.append(high)
+            if low is None and high is None:
+                parts.append(f'{column} IS NOT NULL')
+        clauses.append('(' + ' AND '.join(parts) + ')')
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def build_dimension_section(parts):
+    """
+    Parse every part's dimensions for the search index. 'values' holds
+    [width, length, height] (or null) per part ordinal and 'order' lists the
+    ordinals that have dimensions sorted by (width, length).
+    """
+    values = []
+    for part in parts:
+        dimensions = parse_dimensions(part['name'])
+        values.append(list(dimensions) if dimensions else None)
+    order = sorted((o for o, v in enumerate(values) if v), key=lambda o: (values[o][0], values[o][1], o))
+    return {'fields': FIELDS, 'values': values, 'order': order}
+
+
+def lookup_dimensions(section, dimension_filter):
+    """Return the sorted ordinals matching a filter, using binary search on (width, length)"""
+    values = section['values']
+    order = section['order']
+
+    def key(ordinal):
+        return (values[ordinal][0], values[ordinal][1])
+
+    result = set()
+    for expanded in _expand_sides(dimension_filter):
+        width_low, width_high = expanded.get('width', (None, None))
+        start = 0 if width_low is None else bisect_left(order, (width_low, -1), key=key)
+        end = len(order) if width_high is None else bisect_right(order, (width_high, float('inf')), key=key)
+        # Exact widths narrow the length range to one contiguous run as well
+        if width_low is not None and width_low == width_high and 'length' in expanded:
+            length_low, length_high = expanded['length']
+            if length_low is not None:
+                start = bisect_left(order, (width_low, length_low), start, end, key=key)
+            if length_high is not None:
+                end = bisect_right(order, (width_low, length_high), start, end, key=key)
+        for ordinal in order[start:end]:
+            if matches(values[ordinal], expanded):
+                result.add(ordinal)
+    return sorted(result)
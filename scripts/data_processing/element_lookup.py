@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Element ID and design ID reverse lookups.
+
+The 7-digit element ID printed on LEGO bags identifies a part in one color,
+and the design ID molded into the part usually matches a part number. Both
+are built from elements.csv into two tables in lego.sqlite:
+
+    element_lookup(element_id INTEGER PRIMARY KEY, part_num, color_id)
+    design_lookup(design_id, part_num)   primary key (design_id, part_num)
+
+so resolving either is one indexed probe. ElementLookup holds the same data
+as sorted arrays and answers with a binary search, for callers without a
+database connection.
+"""
+import argparse
+import csv
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+DB_PATH = 'data/lego.sqlite'
+ELEMENTS_CSV = 'data/elements.csv'
+
+
+# Bag element ids have 7 digits, but elements.csv also holds 10-digit ids. Longer
+# all-digit terms aren't ids and could overflow SQLite's 64-bit integers when bound
+MAX_ID_DIGITS = 10
+
+
+def is_numeric_id(term):
+    """True if term could be an element or design id (up to MAX_ID_DIGITS digits)"""
+    term = term.strip()
+    return term.isdigit() and len(term) <= MAX_ID_DIGITS
+
+
+def read_elements(path=ELEMENTS_CSV):
+    """Yield (element_id, part_num, color_id, design_id) with ids as ints (design_id may be None)"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        for element_id, part_num, color_id, design_id in reader:
+            yield int(element_id), part_num, int(color_id), int(design_id) if design_id else None
+
+
+class ElementLookup:
+    """Sorted parallel arrays: element id -> (part, color) and design id -> parts"""
+
+    def __init__(self, elements, designs):
+        # elements: [(element_id, part_num, color_id)], designs: [(design_id, part_num)]
+        elements = sorted(elements)
+        designs = sorted(set(designs))
+        self.part_nums = sorted({part_num for _, part_num, _ in elements} | {part_num for _, part_num in designs})
+        ordinals = {part_num: ordinal for ordinal, part_num in enumerate(self.part_nums)}
+        self.element_ids = array('q', (element_id for element_id, _, _ in elements))
+        self.element_parts = array('i', (ordinals[part_num] for _, part_num, _ in elements))
+        self.element_colors = array('i', (color_id for _, _, color_id in elements))
+        self.design_ids = array('q', (design_id for design_id, _ in designs))
+        self.design_parts = array('i', (ordinals[part_num] for _, part_num in designs))
+
+    @classmethod
+    def from_csv(cls, path=ELEMENTS_CSV):
+        elements, designs = [], []
+        for element_id, part_num, color_id, design_id in read_elements(path):
+            elements.append((element_id, part_num, color_id))
+            if design_id is not None:
+                designs.append((design_id, part_num))
+        return cls(elements, designs)
+
+    @classmethod
+    def load(cls, conn):
+        return cls(conn.execute("SELECT element_id, part_num, color_id FROM element_lookup").fetchall(),
+                   conn.execute("SELECT design_id, part_num FROM design_lookup").fetchall())
+
+    def element(self, element_id):
+        """Return (part_num, color_id) for an element id, or None"""
+        element_id = int(element_id)
+        index = bisect_left(self.element_ids, element_id)
+        if index == len(self.element_ids) or self.element_ids[index] != element_id:
+            return None
+        return self.part_nums[self.element_parts[index]], self.element_colors[index]
+
+    def design(self, design_id):
+        """Return the part numbers molded with a design id"""
+        design_id = int(design_id)
+        start = bisect_left(self.design_ids, design_id)
+        end = bisect_right(self.design_ids, design_id, start)
+        return [self.part_nums[self.design_parts[index]] for index in range(start, end)]
+
+    def resolve(self, term):
+        """Return the part numbers a numeric search term names as an element or design id"""
+        if not is_numeric_id(term):
+            return []
+        part_nums = self.design(term)
+        element = self.element(term)
+        if element and element[0] not in part_nums:
+            part_nums.insert(0, element[0])
+        return part_nums
+
+
+def write_lookup_tables(conn, elements_path=ELEMENTS_CSV):
+    """Replace element_lookup and design_lookup; returns (element rows, design rows)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS element_lookup (
+            element_id INTEGER PRIMARY KEY,
+            part_num TEXT NOT NULL,
+            color_id INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS design_lookup (
+            design_id INTEGER NOT NULL,
+            part_num TEXT NOT NULL,
+            PRIMARY KEY (design_id, part_num)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("DELETE FROM element_lookup")
+    conn.execute("DELETE FROM design_lookup")
+
+    # Inserting in key order keeps both B-trees densely packed
+    elements = sorted(read_elements(elements_path))
+    conn.executemany("INSERT OR REPLACE INTO element_lookup (element_id, part_num, color_id) VALUES (?, ?, ?)",
+                     [(element_id, part_num, color_id) for element_id, part_num, color_id, _ in elements])
+    designs = sorted({(design_id, part_num) for _, part_num, _, design_id in elements if design_id is not None})
+    conn.executemany("INSERT INTO design_lookup (design_id, part_num) VALUES (?, ?)", designs)
+    return len(elements), len(designs)
+
+
+def resolve_numeric_id(conn, term):
+    """Return the part numbers a numeric search term names as an element or design id"""
+    if not is_numeric_id(term):
+        return []
+    rows = conn.execute("""
+        SELECT part_num FROM element_lookup WHERE element_id = ?1
+        UNION
+        SELECT part_num FROM design_lookup WHERE design_id = ?1
+    """, (int(term),))
+    return [row[0] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build element ID and design ID lookup tables from elements.csv')
+    parser.add_argument('--db', default=DB_PATH, help='Path to lego.sqlite')
+    parser.add_argument('--elements', default=ELEMENTS_CSV, help='Path to elements.csv')
+    parser.add_argument('lookup', nargs='*', help='Element or design ids to resolve after building')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    element_count, design_count = write_lookup_tables(conn, args.elements)
+    conn.commit()
+    print(f"Wrote {element_count} element ids and {design_count} design ids in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    lookup = ElementLookup.load(conn)
+    arrays = (lookup.element_ids, lookup.element_parts, lookup.element_colors, lookup.design_ids, lookup.design_parts)
+    print(f"Loaded sorted arrays in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({sum(a.itemsize * len(a) for a in arrays):,} bytes)")
+
+    for term in args.lookup:
+        start = time.perf_counter()
+        part_nums = resolve_numeric_id(conn, term)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{term}: {', '.join(part_nums) or 'not found'} ({elapsed:.2f} ms)")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Fuzzy match candidates for BrickArchitect parts that update_database_enhanced.py
+couldn't match exactly or by normalized part number.
+
+Database part numbers are indexed by character trigrams of their normalized
+key, and names by their search tokens. A query only visits parts that share
+one of its rarest trigrams or one of its rarest name tokens. This is prefix
+filtering: a part that shares none of the rarest
+len(grams) - ceil(threshold * len(grams)) + 1 trigrams can't reach the
+threshold similarity. Only those parts are scored exactly. The work grows
+with the number of plausible candidates, not with the size of the parts
+table.
+
+The candidates go to a CSV for manual review; nothing is written to the
+database.
+"""
+import argparse
+import csv
+import math
+import os
+import sqlite3
+import time
+from collections import defaultdict
+
+from part_numbers import normalize_part_num
+from synonyms import expand_tokens
+
+DB_PATH = 'data/lego.sqlite'
+BA_PARTS_CSV = 'data/ba_parts.csv'
+NOT_MATCHED_PATH = 'data/not_matched_parts.txt'
+CANDIDATES_CSV = 'data/fuzzy_match_candidates.csv'
+
+GRAM_SIZE = 3
+# Trigram Jaccard similarity a part number needs to be a candidate on its own
+MIN_PART_NUM_SIMILARITY = 0.4
+# Name candidates come from this many of the rarest query tokens...
+NAME_SEED_TOKENS = 3
+# ...skipping tokens that appear in more than this share of all parts
+MAX_SEED_TOKEN_SHARE = 0.05
+PART_NUM_WEIGHT = 0.6
+TOP_N = 5
+
+
+def part_num_grams(part_num, n=GRAM_SIZE):
+    """Character n-grams of the normalized part number, with ^ and $ marking the ends"""
+    key = f"^{normalize_part_num(part_num)}$"
+    return {key[i:i + n] for i in range(max(1, len(key) - n + 1))}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class FuzzyMatcher:
+    def __init__(self, parts):
+        """Index parts, a list of (part_num, name) tuples"""
+        self.parts = parts
+        self.part_grams = []
+        self.part_tokens = []
+        self.gram_postings = defaultdict(list)
+        self.token_postings = defaultdict(list)
+
+        for ordinal, (part_num, name) in enumerate(parts):
+            grams = part_num_grams(part_num)
+            tokens = expand_tokens(name or '')
+            self.part_grams.append(grams)
+            self.part_tokens.append(tokens)
+            for gram in grams:
+                self.gram_postings[gram].append(ordinal)
+            for token in tokens:
+                self.token_postings[token].append(ordinal)
+
+        count = len(parts) + 1
+        self.idf = {token: math.log(count / len(postings)) for token, postings in self.token_postings.items()}
+        self.max_seed_postings = max(1, int(MAX_SEED_TOKEN_SHARE * len(parts)))
+
+    def name_similarity(self, query_tokens, tokens):
+        """IDF-weighted Jaccard similarity, so shared rare words count for more than "brick" or "plate" """
+        union = query_tokens | tokens
+        if not union:
+            return 0.0
+        shared = sum(self.idf.get(t, 0.0) for t in query_tokens & tokens)
+        total = sum(self.idf.get(t, math.log(len(self.parts) + 1)) for t in union)
+        return shared / total if total else 0.0
+
+    def part_num_candidates(self, grams, threshold=MIN_PART_NUM_SIMILARITY):
+        ordered = sorted(grams, key=lambda gram: len(self.gram_postings.get(gram, ())))
+        needed = max(1, math.ceil(threshold * len(ordered)))
+        candidates = set()
+        for gram in ordered[:len(ordered) - needed + 1]:
+            candidates.update(self.gram_postings.get(gram, ()))
+        return candidates
+
+    def name_candidates(self, tokens):
+        seeds = sorted((t for t in tokens if t in self.token_postings), key=lambda t: len(self.token_postings[t]))
+        candidates = set()
+        for token in seeds[:NAME_SEED_TOKENS]:
+            if len(self.token_postings[token]) <= self.max_seed_postings:
+                candidates.update(self.token_postings[token])
+        return candidates
+
+    def score(self, ordinal, grams, tokens):
+        part_num_score = jaccard(grams, self.part_grams[ordinal])
+        name_score = self.name_similarity(tokens, self.part_tokens[ordinal])
+        return PART_NUM_WEIGHT * part_num_score + (1 - PART_NUM_WEIGHT) * name_score, part_num_score, name_score
+
+    def candidates(self, part_num, name, top_n=TOP_N, min_score=0.0):
+        """Return up to top_n (part_num, name, score, part_num_score, name_score), best first"""
+        grams = part_num_grams(part_num)
+        tokens = expand_tokens(name or '')
+        ordinals = self.part_num_candidates(grams) | self.name_candidates(tokens)
+        return self._rank(ordinals, grams, tokens, top_n, min_score)
+
+    def brute_force_candidates(self, part_num, name, top_n=TOP_N, min_score=0.0):
+        """Reference implementation scoring every indexed part"""
+        grams = part_num_grams(part_num)
+        tokens = expand_tokens(name or '')
+        return self._rank(range(len(self.parts)), grams, tokens, top_n, min_score)
+
+    def _rank(self, ordinals, grams, tokens, top_n, min_score):
+        results = []
+        for ordinal in ordinals:
+            score, part_num_score, name_score = self.score(ordinal, grams, tokens)
+            if score > min_score:
+                results.append((-score, self.parts[ordinal][0], ordinal, part_num_score, name_score))
+        results.sort()
+        return [(self.parts[ordinal][0], self.parts[ordinal][1], -neg_score, part_num_score, name_score)
+                for neg_score, _, ordinal, part_num_score, name_score in results[:top_n]]
+
+
+def load_database_parts(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT part_num, name FROM parts ORDER BY part_num").fetchall()
+    finally:
+        conn.close()
+
+
+def load_unmatched_parts(database_parts, ba_parts_path=BA_PARTS_CSV, not_matched_path=NOT_MATCHED_PATH):
+    """
+    Return (part_num, ba_name) for BA parts listed in not_matched_parts.txt,
+    or, when that file doesn't exist, for BA parts whose normalized part
+    number isn't in the database.
+    """
+    with open(ba_parts_path, 'r', newline='') as f:
+        ba_parts = [(row['part_num'], row['ba_name']) for row in csv.DictReader(f)]
+
+    if os.path.exists(not_matched_path):
+        with open(not_matched_path, 'r') as f:
+            wanted = {line.strip() for line in f if line.strip()}
+        return [part for part in ba_parts if part[0] in wanted]
+
+    keys = {normalize_part_num(part_num) for part_num, _ in database_parts}
+    return [part for part in ba_parts if normalize_part_num(part[0]) not in keys]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List fuzzy match candidates for unmatched BrickArchitect parts')
+    parser.add_argument('--db', default=DB_PATH, help='Path to lego.sqlite')
+    parser.add_argument('--unmatched', default=NOT_MATCHED_PATH,
+                        help='Unmatched part numbers written by update_database_enhanced.py')
+    parser.add_argument('--output', default=CANDIDATES_CSV, help='Review CSV to write')
+    parser.add_argument('--top', type=int, default=TOP_N, help='Candidates per BA part')
+    parser.add_argument('--min-score', type=float, default=0.2, help='Drop candidates scoring at or below this')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    database_parts = load_database_parts(args.db)
+    matcher = FuzzyMatcher(database_parts)
+    unmatched = load_unmatched_parts(database_parts, not_matched_path=args.unmatched)
+    index_time = time.perf_counter() - start
+    print(f"Indexed {len(database_parts)} database parts in {index_time:.2f}s")
+
+    start = time.perf_counter()
+    rows = []
+    with_candidates = 0
+    for part_num, ba_name in unmatched:
+        candidates = matcher.candidates(part_num, ba_name, args.top, args.min_score)
+        if candidates:
+            with_candidates += 1
+        for rank, (candidate, name, score, part_num_score, name_score) in enumerate(candidates, 1):
+            rows.append([part_num, ba_name, rank, candidate, name,
+                         f"{score:.3f}", f"{part_num_score:.3f}", f"{name_score:.3f}"])
+    match_time = time.perf_counter() - start
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ba_part_num', 'ba_name', 'rank', 'part_num', 'name', 'score', 'part_num_score', 'name_score'])
+        writer.writerows(rows)
+
+    per_part = match_time / len(unmatched) * 1000 if unmatched else 0
+    print(f"Matched {len(unmatched)} unmatched BA parts in {match_time:.2f}s ({per_part:.2f} ms each)")
+    print(f"{with_candidates} have candidates; {len(rows)} rows written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import sqlite3
+import time
+from itertools import islice
+
+BATCH_SIZE = 5000
+
+# example_design_id prefers these colors in order, then any other color
+# (White, Light Bluish Gray, Dark Bluish Gray, Black)
+PREFERRED_COLORS = [15, 71, 72, 0]
+COLOR_PRIORITY = {color_id: priority for priority, color_id in enumerate(PREFERRED_COLORS)}
+OTHER_COLOR_PRIORITY = len(PREFERRED_COLORS)
+
+parser = argparse.ArgumentParser(description='Import data/elements.csv and pick each part\'s example_design_id')
+parser.add_argument('--csv', default='data/elements.csv', help='Elements CSV to import')
+args = parser.parse_args()
+
+# Best (priority, design_id) per part, filled while the CSV streams past
+best_design = {}
+
+
+def read_batches(path):
+    """Yield lists of (element_id, part_num, color_id, design_id), choosing design ids on the way"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        while True:
+            batch = []
+            for element_id, part_num, color_id, design_id in islice(reader, BATCH_SIZE):
+                color_id = int(color_id)
+                design_id = int(design_id) if design_id else None
+                batch.append((element_id, part_num, color_id, design_id))
+
+                # Elements without a design id can't provide an example image.
+                # Ties keep the first element seen, as the SQL scripts did.
+                if design_id is not None:
+                    priority = COLOR_PRIORITY.get(color_id, OTHER_COLOR_PRIORITY)
+                    current = best_design.get(part_num)
+                    if current is None or priority < current[0]:
+                        best_design[part_num] = (priority, design_id)
+            if not batch:
+                return
+            yield batch
+
+
+# Connect to the SQLite database
+print("Connecting to database...")
+conn = sqlite3.connect('data/lego.sqlite')
+cursor = conn.cursor()
+
+cursor.execute("""
+    CREATE TABLE IF NOT EXISTS elements (
+        element_id TEXT PRIMARY KEY,
+        part_num TEXT,
+        color_id INTEGER,
+        design_id INTEGER
+    )
+""")
+cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_elements_element_id ON elements(element_id)")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_elements_part_num ON elements(part_num)")
+
+cursor.execute("PRAGMA table_info(parts)")
+if 'example_design_id' not in [column[1] for column in cursor.fetchall()]:
+    print("Adding example_design_id column to parts table...")
+    cursor.execute("ALTER TABLE parts ADD COLUMN example_design_id INTEGER")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_parts_example_design_id ON parts(example_design_id)")
+
+# Stream the CSV into a keyed staging table
+print("Reading elements...")
+start = time.perf_counter()
+cursor.execute("""
+    CREATE TEMP TABLE elements_staging (
+        element_id TEXT PRIMARY KEY,
+        part_num TEXT,
+        color_id INTEGER,
+        design_id INTEGER
+    )
+""")
+rows_read = 0
+for batch in read_batches(args.csv):
+    cursor.executemany("INSERT OR REPLACE INTO elements_staging VALUES (?, ?, ?, ?)", batch)
+    rows_read += len(batch)
+load_time = time.perf_counter() - start
+
+# Apply only the elements that were added, removed or changed
+start = time.perf_counter()
+cursor.execute("""
+    DELETE FROM elements WHERE NOT EXISTS (
+        SELECT 1 FROM elements_staging s WHERE s.element_id = elements.element_id
+    )
+""")
+removed = cursor.rowcount
+cursor.execute("""
+    UPDATE elements SET part_num = s.part_num, color_id = s.color_id, design_id = s.design_id
+    FROM elements_staging s
+    WHERE s.element_id = elements.element_id
+      AND (s.part_num IS NOT elements.part_num
+           OR s.color_id IS NOT elements.color_id
+           OR s.design_id IS NOT elements.design_id)
+""")
+changed = cursor.rowcount
+cursor.execute("""
+    INSERT OR IGNORE INTO elements (element_id, part_num, color_id, design_id)
+    SELECT element_id, part_num, color_id, design_id FROM elements_staging
+""")
+added = cursor.rowcount
+cursor.execute("DROP TABLE elements_staging")
+
+# Write example design ids with one joined update, touching only parts whose choice changed
+cursor.execute("CREATE TEMP TABLE design_staging (part_num TEXT PRIMARY KEY, design_id INTEGER)")
+cursor.executemany("INSERT INTO design_staging VALUES (?, ?)",
+                   [(part_num, design_id) for part_num, (_, design_id) in best_design.items()])
+cursor.execute("""
+    UPDATE parts SET example_design_id = s.design_id
+    FROM design_staging s
+    WHERE s.part_num = parts.part_num AND parts.example_design_id IS NOT s.design_id
+""")
+designs_updated = cursor.rowcount
+cursor.execute("""
+    UPDATE parts SET example_design_id = NULL
+    WHERE example_design_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM design_staging s WHERE s.part_num = parts.part_num)
+""")
+designs_cleared = cursor.rowcount
+cursor.execute("DROP TABLE design_staging")
+apply_time = time.perf_counter() - start
+
+# Commit changes and close connection
+conn.commit()
+
+cursor.execute("SELECT COUNT(*), COUNT(example_design_id) FROM parts")
+total_parts, with_design = cursor.fetchone()
+conn.close()
+
+print(f"Read {rows_read} elements in {load_time:.2f}s ({rows_read / load_time if load_time else 0:,.0f} rows/s)")
+print(f"Elements: {added} added, {removed} removed, {changed} changed ({apply_time:.2f}s to apply)")
+print(f"example_design_id: {designs_updated} set, {designs_cleared} cleared")
+print(f"Update complete. {with_design} of {total_parts} parts have an example design id.")
@@ -1,54 +1,151 @@
 #!/usr/bin/env python3
+import argparse
 import csv
 import sqlite3
+import time
+from itertools import islice
+
+BATCH_SIZE = 5000
+
+# Lookup indexes used by the web app; dropped and rebuilt around large loads
+INDEXES = {
+    'idx_part_relationships_rel_type': 'part_relationships(rel_type)',
+    'idx_part_relationships_child_part_num': 'part_relationships(child_part_num)',
+    'idx_part_relationships_parent_part_num': 'part_relationships(parent_part_num)',
+}
+
+parser = argparse.ArgumentParser(description='Import data/part_relationships.csv into the database')
+parser.add_argument('--delta', action='store_true',
+                    help='Make the table match the CSV by applying only added, removed and changed relationships')
+parser.add_argument('--csv', default='data/part_relationships.csv', help='Relationships CSV to import')
+args = parser.parse_args()
+
+
+def read_batches(path):
+    """Yield lists of (rel_type, child_part_num, parent_part_num) without reading the whole file"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        rows = (tuple(row) for row in reader)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+
 
 # Connect to the SQLite database
 conn = sqlite3.connect('data/lego.sqlite')
 cursor = conn.cursor()
 
-# Create a dictionary to track unique relationships (to handle duplicates)
-unique_relationships = {}
+cursor.execute("""
+    CREATE TABLE IF NOT EXISTS part_relationships (
+        rel_type TEXT,
+        child_part_num TEXT,
+        parent_part_num TEXT
+    )
+""")
 
-# Read the CSV file
-with open('data/part_relationships.csv', 'r') as f:
-    reader = csv.reader(f)
-    next(reader)  # Skip header row
+# Each child/parent pair is stored once; the first rel_type seen for a pair wins.
+# Earlier versions appended on every run, so drop those duplicates first.
+cursor.execute("""
+    SELECT COUNT(*) FROM sqlite_master
+    WHERE type = 'index' AND name = 'idx_part_relationships_pair'
+""")
+if not cursor.fetchone()[0]:
+    cursor.execute("""
+        DELETE FROM part_relationships WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM part_relationships GROUP BY child_part_num, parent_part_num
+        )
+    """)
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} duplicate relationships")
+    cursor.execute("""
+        CREATE UNIQUE INDEX idx_part_relationships_pair
+        ON part_relationships(child_part_num, parent_part_num)
+    """)
+
+cursor.execute("SELECT COUNT(*) FROM part_relationships")
+existing = cursor.fetchone()[0]
 
-    for row in reader:
-        rel_type, child_part_num, parent_part_num = row
+start = time.perf_counter()
+rows_read = 0
 
-        # Use the combination of child_part_num and parent_part_num as key
-        relationship_key = (child_part_num, parent_part_num)
+if args.delta:
+    # Stream the CSV into a keyed staging table, then diff it against the table
+    cursor.execute("""
+        CREATE TEMP TABLE relationships_staging (
+            rel_type TEXT,
+            child_part_num TEXT,
+            parent_part_num TEXT,
+            PRIMARY KEY (child_part_num, parent_part_num)
+        )
+    """)
+    for batch in read_batches(args.csv):
+        cursor.executemany(
+            "INSERT OR IGNORE INTO relationships_staging (rel_type, child_part_num, parent_part_num) VALUES (?, ?, ?)",
+            batch
+        )
+        rows_read += len(batch)
 
-        # Only keep the first occurrence of each relationship
-        if relationship_key not in unique_relationships:
-            unique_relationships[relationship_key] = rel_type
+    cursor.execute("""
+        DELETE FROM part_relationships WHERE NOT EXISTS (
+            SELECT 1 FROM relationships_staging s
+            WHERE s.child_part_num = part_relationships.child_part_num
+              AND s.parent_part_num = part_relationships.parent_part_num
+        )
+    """)
+    removed = cursor.rowcount
+    cursor.execute("""
+        UPDATE part_relationships SET rel_type = s.rel_type
+        FROM relationships_staging s
+        WHERE s.child_part_num = part_relationships.child_part_num
+          AND s.parent_part_num = part_relationships.parent_part_num
+          AND s.rel_type IS NOT part_relationships.rel_type
+    """)
+    changed = cursor.rowcount
+    cursor.execute("""
+        INSERT OR IGNORE INTO part_relationships (rel_type, child_part_num, parent_part_num)
+        SELECT rel_type, child_part_num, parent_part_num FROM relationships_staging ORDER BY rowid
+    """)
+    added = cursor.rowcount
+    cursor.execute("DROP TABLE relationships_staging")
+    print(f"Delta: {added} added, {removed} removed, {changed} changed type")
+else:
+    # Building indexes once at the end is much cheaper than maintaining them row by row
+    large_load = existing == 0
+    if large_load:
+        for name in INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
 
-# Insert the unique relationships into the database
-for (child_part_num, parent_part_num), rel_type in unique_relationships.items():
-    try:
-        cursor.execute(
-            "INSERT INTO part_relationships (rel_type, child_part_num, parent_part_num) VALUES (?, ?, ?)",
-            (rel_type, child_part_num, parent_part_num)
+    # Re-running is safe: pairs already in the table are ignored
+    added = 0
+    for batch in read_batches(args.csv):
+        before = conn.total_changes
+        cursor.executemany(
+            "INSERT OR IGNORE INTO part_relationships (rel_type, child_part_num, parent_part_num) VALUES (?, ?, ?)",
+            batch
         )
-    except sqlite3.Error as e:
-        print(f"Error inserting {child_part_num}, {parent_part_num}: {e}")
+        added += conn.total_changes - before
+        rows_read += len(batch)
+    print(f"Inserted {added} new relationships ({rows_read - added} already present or duplicated)")
 
 # Create indexes for better performance
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_part_relationships_rel_type ON part_relationships(rel_type)")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_part_relationships_child_part_num ON part_relationships(child_part_num)")
-cursor.execute("CREATE INDEX IF NOT EXISTS idx_part_relationships_parent_part_num ON part_relationships(parent_part_num)")
+for name, columns in INDEXES.items():
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
 
 # Commit changes and close connection
 conn.commit()
+elapsed = time.perf_counter() - start
 
 # Print statistics
 cursor.execute("SELECT COUNT(*) FROM part_relationships")
 total = cursor.fetchone()[0]
 print(f"Total relationships imported: {total}")
+print(f"Read {rows_read} rows in {elapsed:.2f}s ({rows_read / elapsed if elapsed else 0:,.0f} rows/s)")
 
 cursor.execute("SELECT rel_type, COUNT(*) FROM part_relationships GROUP BY rel_type")
 for rel_type, count in cursor.fetchall():
     print(f"Relationship type {rel_type}: {count} records")
 
-conn.close()
\ No newline at end of file
+conn.close()
@@ -0,0 +1,107 @@
+"""
+Inverted token index for the search index.
+
+Each part is referred to by its ordinal (position in the index's parts list).
+The index maps every normalized token to the sorted ordinals of the parts that
+contain it, and every token prefix to the sorted ordinals of the parts that
+contain a token starting with it. A query is answered by intersecting the
+posting lists of its tokens instead of scanning every part name.
+"""
+from bisect import bisect_left
+
+from search_text import tokenize
+from synonyms import query_tokens
+
+
+def build_inverted_index(parts, min_prefix=1, part_tokens=None):
+    """
+    part_tokens, if given, returns the set of tokens to index for a part (see
+    synonyms.expand_tokens); queries against such an index are canonicalized
+    with synonyms.query_tokens.
+    """
+    tokens = {}
+    prefixes = {}
+
+    for ordinal, part in enumerate(parts):
+        indexed = part_tokens(part) if part_tokens else set(part['normalized_name'].split())
+        for token in indexed:
+            tokens.setdefault(token, []).append(ordinal)
+            for length in range(min_prefix, len(token) + 1):
+                postings = prefixes.setdefault(token[:length], [])
+                # Several tokens of the same part can share a prefix
+                if not postings or postings[-1] != ordinal:
+                    postings.append(ordinal)
+
+    # Ordinals are appended in increasing order, so the lists are already sorted
+    return {
+        'min_prefix': min_prefix,
+        'expanded': part_tokens is not None,
+        'tokens': dict(sorted(tokens.items())),
+        'prefixes': dict(sorted(prefixes.items()))
+    }
+
+
+def intersect(a, b):
+    """Intersect two sorted posting lists, galloping through the longer one"""
+    if len(a) > len(b):
+        a, b = b, a
+    result = []
+    lo = 0
+    for ordinal in a:
+        lo = bisect_left(b, ordinal, lo)
+        if lo == len(b):
+            break
+        if b[lo] == ordinal:
+            result.append(ordinal)
+    return result
+
+
+def lookup(index, query, prefix=True):
+    """
+    Return the sorted ordinals of parts matching every query token.
+    With prefix=True a query token matches any indexed token it is a prefix of,
+    so "tech br" finds "Technic Brick".
+    """
+    tokens = query_tokens(query) if index.get('expanded') else tokenize(query)
+    if not tokens:
+        return []
+
+    table = index['prefixes'] if prefix else index['tokens']
+    postings = []
+    for token in set(tokens):
+        if prefix and len(token) < index['min_prefix']:
+            continue
+        found = table.get(token)
+        if not found:
+            return []
+        postings.append(found)
+
+    if not postings:
+        return []
+
+    # Start with the rarest token to keep the intermediate result small
+    postings.sort(key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        result = intersect(result, other)
+        if not result:
+            break
+    return list(result)
+
+
+def linear_lookup(parts, query, prefix=True):
+    """Reference implementation that scans every part, used for benchmarks and checks"""
+    wanted = set(tokenize(query))
+    if not wanted:
+        return []
+
+    result = []
+    for ordinal, part in enumerate(parts):
+        name_tokens = part['normalized_name'].split()
+        if prefix:
+            matched = all(any(t.startswith(q) for t in name_tokens) for q in wanted)
+        else:
+            matched = wanted.issubset(name_tokens)
+        if matched:
+            result.append(ordinal)
+    return result
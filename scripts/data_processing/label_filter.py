@@ -0,0 +1,105 @@
+"""
+Bloom filter of the part numbers that have a label file.
+
+Clients check the filter before calling /api/download-label or
+/api/convert-label: a miss means the part certainly has no .lbx label, so
+the request can be skipped; a hit is right except for the configured
+false-positive rate.
+
+File layout (little-endian):
+
+    magic 'LGBF', format version (uint32), hash count k (uint32),
+    bit count m (uint64), item count n (uint64), then ceil(m / 8) bytes of bits
+
+Bit positions use double hashing over blake2b(part_num, digest_size=16):
+h1 and h2 are the first and last 8 bytes as unsigned integers, and the i-th
+position is (h1 + i * h2) mod m. Bit b lives in byte b // 8, mask 1 << (b % 8).
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import struct
+
+MAGIC = b'LGBF'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIIQQ')
+LABEL_FILTER_PATH = 'data/search_index.labels.bloom'
+DEFAULT_FP_RATE = 0.01
+
+
+def _hashes(part_num):
+    digest = hashlib.blake2b(part_num.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+class BloomFilter:
+    def __init__(self, bit_count, hash_count, bits=None, item_count=0):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.item_count = item_count
+        self.bits = bytearray(bits) if bits is not None else bytearray((bit_count + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate=DEFAULT_FP_RATE):
+        """Size a filter for capacity items at the given false-positive rate, which must be in (0, 1)"""
+        if not 0 < fp_rate < 1:
+            raise ValueError(f"False-positive rate must be between 0 and 1, got {fp_rate}")
+        capacity = max(capacity, 1)
+        bit_count = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bit_count / capacity * math.log(2)))
+        return cls(bit_count, hash_count)
+
+    def _positions(self, part_num):
+        h1, h2 = _hashes(part_num)
+        return ((h1 + i * h2) % self.bit_count for i in range(self.hash_count))
+
+    def add(self, part_num):
+        for position in self._positions(part_num):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.item_count += 1
+
+    def __contains__(self, part_num):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(part_num))
+
+    def expected_fp_rate(self):
+        return (1 - math.exp(-self.hash_count * self.item_count / self.bit_count)) ** self.hash_count
+
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, FORMAT_VERSION, self.hash_count, self.bit_count, self.item_count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, hash_count, bit_count, item_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a version {FORMAT_VERSION} label filter")
+        return cls(bit_count, hash_count, data[HEADER.size:], item_count)
+
+
+def load_labelled_parts(db_path='data/lego.sqlite'):
+    """Return the part numbers that have a non-empty label_file"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT part_num FROM parts WHERE label_file IS NOT NULL AND label_file != ''")
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+def build_label_filter(part_nums, fp_rate=DEFAULT_FP_RATE):
+    bloom = BloomFilter.for_capacity(len(part_nums), fp_rate)
+    for part_num in part_nums:
+        bloom.add(part_num)
+    return bloom
+
+
+def write_label_filter(bloom, path=LABEL_FILTER_PATH):
+    with open(path, 'wb') as f:
+        f.write(bloom.to_bytes())
+
+
+def load_label_filter(path=LABEL_FILTER_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return BloomFilter.from_bytes(f.read())
@@ -14,6 +14,10 @@ from pathlib import Path
 from PIL import Image, ImageTk
 from dotenv import load_dotenv
 
+from dimensions import parse_dimension_query, sql_dimension_clause
+from element_lookup import is_numeric_id
+from part_numbers import normalize_part_num
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -122,6 +126,17 @@ class LegoPartsSearch(tk.Tk):
                 # Load categories for dropdown
                 self.categories = self.load_categories()
                 logging.info(f"Loaded {len(self.categories)} categories")
+
+                # Dimension columns are added by update_dimensions.py and the
+                # normalized part number by update_database_enhanced.py
+                self.cursor.execute("PRAGMA table_info(parts)")
+                part_columns = [row[1] for row in self.cursor.fetchall()]
+                self.has_dimension_columns = 'dim_width' in part_columns
+                self.has_normalized_part_nums = 'part_num_normalized' in part_columns
+
+                # Element and design id lookups are built by element_lookup.py
+                self.cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'element_lookup'")
+                self.has_element_lookup = self.cursor.fetchone()[0] > 0
             except sqlite3.Error as e:
                 error_msg = f"Database error: {e}"
                 logging.error(error_msg)
@@ -563,6 +578,22 @@ class LegoPartsSearch(tk.Tk):
             self.update_debug(f"Label filter ERROR: {e}")
             self.status_var.set(f"Error: {e}")
 
+    def text_clause(self, term):
+        """Return (sql, params) matching a term against part numbers and names"""
+        sql = "p.part_num LIKE ? OR p.name LIKE ?"
+        params = [f"%{term}%", f"%{term}%"]
+        # "3001" also finds "003001" through the indexed normalized key
+        key = normalize_part_num(term)
+        if self.has_normalized_part_nums and key:
+            sql += " OR p.part_num_normalized = ?"
+            params.append(key)
+        # A bag's element id (or a design id) resolves with one probe of the lookup tables
+        if self.has_element_lookup and is_numeric_id(term):
+            sql += (" OR p.part_num IN (SELECT part_num FROM element_lookup WHERE element_id = ?"
+                    " UNION SELECT part_num FROM design_lookup WHERE design_id = ?)")
+            params += [int(term), int(term)]
+        return f"({sql})", params
+
     def search_parts(self, search_term):
         """Search for parts based on the search term and selected category"""
         # Clear previous results
@@ -593,12 +624,25 @@ class LegoPartsSearch(tk.Tk):
                 p.label_file
             FROM parts p
             LEFT JOIN part_categories c ON p.part_cat_id = c.id
-            WHERE (p.part_num LIKE ? OR p.name LIKE ?)
         """
 
-        # Add category filter if a specific category is selected
-        params = [f"%{search_term}%", f"%{search_term}%"]
+        # Dimension searches like "2x4" or "plate 2xN N>=6" use the indexed dim_* columns
+        dimension_filter, name_term = None, search_term
+        if self.has_dimension_columns:
+            dimension_filter, name_term = parse_dimension_query(search_term)
+
+        if dimension_filter:
+            dimension_sql, params = sql_dimension_clause(dimension_filter)
+            query += f" WHERE {dimension_sql}"
+            if name_term:
+                text_sql, text_params = self.text_clause(name_term)
+                query += f" AND {text_sql}"
+                params += text_params
+        else:
+            text_sql, params = self.text_clause(search_term)
+            query += f" WHERE {text_sql}"
 
+        # Add category filter if a specific category is selected
         if category_id != 0:  # Not "All Categories"
             query += " AND p.part_cat_id = ?"
             params.append(category_id)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Per-part color bitsets and per-color part bitmaps from elements.csv.
+
+Every color in colors.csv gets a bit (its position when sorted by id) and
+every part number an ordinal (its position when sorted). Two tables are
+written to lego.sqlite:
+
+    part_colors(part_num, ordinal, color_count, colors)   colors: bit per color
+    color_parts(color_id, part_count, parts)              parts: bit per part ordinal
+
+Both bitsets are little-endian BLOBs: bit b lives in byte b // 8, mask
+1 << (b % 8). ColorIndex loads them once, after which "parts matching X that
+exist in Dark Red" is an AND of the matches' bitmap with Dark Red's bitmap
+instead of a join over every element row.
+"""
+import argparse
+import csv
+import sqlite3
+import time
+from collections import defaultdict
+
+DB_PATH = 'data/lego.sqlite'
+ELEMENTS_CSV = 'data/elements.csv'
+COLORS_CSV = 'data/colors.csv'
+
+
+def to_blob(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def from_blob(blob):
+    return int.from_bytes(blob, 'little')
+
+
+def iter_bits(bits):
+    """Yield the positions of the set bits in bits, lowest first"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def read_colors(path=COLORS_CSV):
+    """Return [(color_id, name)] sorted by color id"""
+    with open(path, 'r', newline='') as f:
+        return sorted((int(row['id']), row['name']) for row in csv.DictReader(f))
+
+
+def build_color_sets(elements_path=ELEMENTS_CSV):
+    """Return {part_num: set of color ids} from elements.csv"""
+    part_colors = defaultdict(set)
+    with open(elements_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        for _, part_num, color_id, _ in reader:
+            part_colors[part_num].add(int(color_id))
+    return part_colors
+
+
+def write_color_bitsets(conn, colors, part_colors):
+    """Replace color_bits, part_colors and color_parts; returns the number of parts written"""
+    colors = list(colors)
+    color_bit = {color_id: bit for bit, (color_id, _) in enumerate(colors)}
+    # Elements may use colors newer than colors.csv; give them bits after the known ones
+    for color_id in sorted({c for color_ids in part_colors.values() for c in color_ids} - color_bit.keys()):
+        color_bit[color_id] = len(color_bit)
+        colors.append((color_id, ''))
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS color_bits (
+            bit INTEGER PRIMARY KEY,
+            color_id INTEGER NOT NULL UNIQUE,
+            name TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS part_colors (
+            part_num TEXT PRIMARY KEY,
+            ordinal INTEGER NOT NULL UNIQUE,
+            color_count INTEGER NOT NULL,
+            colors BLOB NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS color_parts (
+            color_id INTEGER PRIMARY KEY,
+            part_count INTEGER NOT NULL,
+            parts BLOB NOT NULL
+        )
+    """)
+    for table in ('color_bits', 'part_colors', 'color_parts'):
+        conn.execute(f"DELETE FROM {table}")
+
+    conn.executemany("INSERT INTO color_bits (bit, color_id, name) VALUES (?, ?, ?)",
+                     [(color_bit[color_id], color_id, name) for color_id, name in colors])
+
+    color_parts = defaultdict(int)
+    rows = []
+    for ordinal, part_num in enumerate(sorted(part_colors)):
+        bits = 0
+        for color_id in part_colors[part_num]:
+            bits |= 1 << color_bit[color_id]
+            color_parts[color_id] |= 1 << ordinal
+        rows.append((part_num, ordinal, len(part_colors[part_num]), to_blob(bits)))
+    conn.executemany("INSERT INTO part_colors (part_num, ordinal, color_count, colors) VALUES (?, ?, ?, ?)", rows)
+    conn.executemany("INSERT INTO color_parts (color_id, part_count, parts) VALUES (?, ?, ?)",
+                     [(color_id, bin(bits).count('1'), to_blob(bits)) for color_id, bits in color_parts.items()])
+    return len(rows)
+
+
+class ColorIndex:
+    """In-memory view of the color bitsets; load it once and query it per search"""
+
+    def __init__(self, colors, part_nums, part_colors, color_parts):
+        self.colors = colors                 # [(color_id, name)] indexed by bit
+        self.part_nums = part_nums           # part_num per ordinal
+        self.ordinals = {part_num: ordinal for ordinal, part_num in enumerate(part_nums)}
+        self.part_colors = part_colors       # color bitset per ordinal
+        self.color_parts = color_parts       # {color_id: part bitmap}
+        self.color_ids = {name.lower(): color_id for color_id, name in colors if name}
+
+    @classmethod
+    def load(cls, conn):
+        colors = conn.execute("SELECT color_id, name FROM color_bits ORDER BY bit").fetchall()
+        part_nums, part_colors = [], []
+        for part_num, blob in conn.execute("SELECT part_num, colors FROM part_colors ORDER BY ordinal"):
+            part_nums.append(part_num)
+            part_colors.append(from_blob(blob))
+        color_parts = {color_id: from_blob(blob) for color_id, blob in conn.execute("SELECT color_id, parts FROM color_parts")}
+        return cls(colors, part_nums, part_colors, color_parts)
+
+    def color_id(self, color):
+        """Resolve a color id or a case-insensitive name such as 'Dark Red'; raises KeyError if unknown"""
+        if isinstance(color, int):
+            return color
+        if color.lstrip('-').isdigit():
+            return int(color)
+        return self.color_ids[color.strip().lower()]
+
+    def colors_of(self, part_num):
+        """Return the color ids part_num exists in"""
+        ordinal = self.ordinals.get(part_num)
+        if ordinal is None:
+            return []
+        return [self.colors[bit][0] for bit in iter_bits(self.part_colors[ordinal])]
+
+    def bitmap(self, part_nums):
+        """Return the part bitmap of part_nums; parts without elements are left out"""
+        bits = 0
+        for part_num in part_nums:
+            ordinal = self.ordinals.get(part_num)
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def color_bitmap(self, colors, match_all=True):
+        """Return the bitmap of parts available in every color (or any color when match_all is False)"""
+        bitmaps = [self.color_parts.get(self.color_id(color), 0) for color in colors]
+        if not bitmaps:
+            return 0
+        bits = bitmaps[0]
+        for other in bitmaps[1:]:
+            bits = bits & other if match_all else bits | other
+        return bits
+
+    def decode(self, bits):
+        """Return the part numbers in a bitmap, sorted"""
+        return [self.part_nums[ordinal] for ordinal in iter_bits(bits)]
+
+    def filter_parts(self, part_nums, colors, match_all=True):
+        """Return the part numbers from part_nums that exist in the given colors, sorted"""
+        return self.decode(self.bitmap(part_nums) & self.color_bitmap(colors, match_all))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build per-part color bitsets and per-color part bitmaps')
+    parser.add_argument('--db', default=DB_PATH, help='Path to lego.sqlite')
+    parser.add_argument('--elements', default=ELEMENTS_CSV, help='Path to elements.csv')
+    parser.add_argument('--colors', default=COLORS_CSV, help='Path to colors.csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    colors = read_colors(args.colors)
+    part_colors = build_color_sets(args.elements)
+    conn = sqlite3.connect(args.db)
+    part_count = write_color_bitsets(conn, colors, part_colors)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+
+    blob_bytes = conn.execute("SELECT SUM(LENGTH(colors)) FROM part_colors").fetchone()[0] or 0
+    bitmap_bytes = conn.execute("SELECT SUM(LENGTH(parts)) FROM color_parts").fetchone()[0] or 0
+    print(f"Built color bitsets for {part_count} parts and {len(colors)} colors in {elapsed:.2f}s")
+    print(f"Part color bitsets: {blob_bytes:,} bytes; color part bitmaps: {bitmap_bytes:,} bytes")
+
+    # Example: plates that exist in Dark Red
+    start = time.perf_counter()
+    index = ColorIndex.load(conn)
+    load_time = time.perf_counter() - start
+    plates = [row[0] for row in conn.execute("SELECT part_num FROM parts WHERE name LIKE '%plate%'")]
+    start = time.perf_counter()
+    matches = index.filter_parts(plates, ['Dark Red'])
+    query_time = time.perf_counter() - start
+    conn.close()
+    print(f"Loaded in {load_time * 1000:.1f} ms; {len(matches)} of {len(plates)} plates exist in Dark Red "
+          f"({query_time * 1000:.2f} ms)")
+
+
+if __name__ == '__main__':
+    main()
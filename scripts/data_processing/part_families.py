@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Connected part families from part_relationships.csv.
+
+Union-find groups every part connected by relationships of a family type,
+however long the chain: a single rel_type ('P' prints, 'M' molds, ...) or a
+combination such as 'MRT', the mold/replacement/alias set alt_part_ids is
+built from. Each family is named after its smallest part number. The
+part_families table stores one row per (family_type, part_num), so all
+variants of a part are one indexed self-join:
+
+    SELECT v.part_num FROM part_families f
+    JOIN part_families v ON v.family_type = f.family_type AND v.family_id = f.family_id
+    WHERE f.family_type = 'P' AND f.part_num = '3626c'
+"""
+import argparse
+import csv
+import sqlite3
+import time
+from collections import defaultdict
+
+DB_PATH = 'data/lego.sqlite'
+RELATIONSHIPS_CSV = 'data/part_relationships.csv'
+# Combined family types on top of one family per rel_type
+COMBINED_FAMILY_TYPES = ['MRT']
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent == item:
+            self.size.setdefault(item, 1)
+            return item
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        # Union by size keeps the trees shallow
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        return root_a
+
+
+def read_relationships(path=RELATIONSHIPS_CSV):
+    """Yield (rel_type, child_part_num, parent_part_num) rows"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        for rel_type, child_part_num, parent_part_num in reader:
+            yield rel_type, child_part_num, parent_part_num
+
+
+def build_families(relationships, combined_types=COMBINED_FAMILY_TYPES):
+    """
+    Return {family_type: {part_num: (family_id, family_size, rel_types)}},
+    where rel_types lists the relationship types found inside the family.
+    """
+    relationships = list(relationships)
+    family_types = sorted({rel_type for rel_type, _, _ in relationships}) + list(combined_types)
+
+    families = {}
+    for family_type in family_types:
+        sets = UnionFind()
+        for rel_type, child_part_num, parent_part_num in relationships:
+            if rel_type in family_type:
+                sets.union(child_part_num, parent_part_num)
+
+        members = defaultdict(list)
+        for part_num in sets.parent:
+            members[sets.find(part_num)].append(part_num)
+        edge_types = defaultdict(set)
+        for rel_type, child_part_num, _ in relationships:
+            if rel_type in family_type:
+                edge_types[sets.find(child_part_num)].add(rel_type)
+
+        families[family_type] = {}
+        for root, parts in members.items():
+            family_id = min(parts)
+            rel_types = ''.join(sorted(edge_types[root]))
+            for part_num in parts:
+                families[family_type][part_num] = (family_id, len(parts), rel_types)
+    return families
+
+
+def write_families(conn, families):
+    """Replace the part_families table; returns the number of rows written"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS part_families (
+            family_type TEXT NOT NULL,
+            part_num TEXT NOT NULL,
+            family_id TEXT NOT NULL,
+            family_size INTEGER NOT NULL,
+            rel_types TEXT NOT NULL,
+            PRIMARY KEY (family_type, part_num)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_part_families_family ON part_families(family_type, family_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_part_families_part_num ON part_families(part_num)")
+    conn.execute("DELETE FROM part_families")
+
+    rows = [(family_type, part_num, family_id, family_size, rel_types)
+            for family_type, members in families.items()
+            for part_num, (family_id, family_size, rel_types) in members.items()]
+    conn.executemany(
+        "INSERT INTO part_families (family_type, part_num, family_id, family_size, rel_types) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+
+def family_members(conn, part_num, family_type):
+    """Return every part in part_num's family, including part_num, or [part_num] when it has none"""
+    rows = conn.execute("""
+        SELECT v.part_num FROM part_families f
+        JOIN part_families v ON v.family_type = f.family_type AND v.family_id = f.family_id
+        WHERE f.family_type = ? AND f.part_num = ?
+        ORDER BY v.part_num
+    """, (family_type, part_num)).fetchall()
+    return [row[0] for row in rows] or [part_num]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Group parts into families connected by part relationships')
+    parser.add_argument('--db', default=DB_PATH, help='Path to lego.sqlite')
+    parser.add_argument('--csv', default=RELATIONSHIPS_CSV, help='Relationships CSV')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    families = build_families(read_relationships(args.csv))
+    build_time = time.perf_counter() - start
+
+    conn = sqlite3.connect(args.db)
+    row_count = write_families(conn, families)
+    conn.commit()
+    conn.close()
+
+    print(f"Built families in {build_time:.2f}s; {row_count} rows written to part_families")
+    for family_type, members in families.items():
+        sizes = defaultdict(int)
+        for family_id, _, _ in members.values():
+            sizes[family_id] += 1
+        print(f"Family type {family_type}: {len(sizes)} families, {len(members)} parts, largest {max(sizes.values(), default=0)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Lexical decomposition of part numbers.
+
+Rebrickable part numbers are built from a base mold plus suffixes:
+
+    3626cpr3662        base 3626, mold c, print pr3662
+    973c26h01pr0391    base 973, assembly c26h01 (arms and hands), print pr0391
+    16709pats01pr0001  base 16709, pattern pats01, print pr0001
+    20608pat0001       base 20608, pattern pat0001
+
+Every part number from the database and elements.csv is split into those
+components and stored in part_num_components with indexes on base and
+base_mold. Prefix and family queries ("every 3626c print") then hit an index
+instead of LIKE '3626c%', and parts missing from part_relationships.csv are
+still grouped with their relatives.
+"""
+import argparse
+import csv
+import re
+import sqlite3
+import time
+
+DB_PATH = 'data/lego.sqlite'
+ELEMENTS_CSV = 'data/elements.csv'
+BATCH_SIZE = 5000
+
+PART_NUM_PATTERN = re.compile(r'''
+    ^(?P<base>[a-z]*\d+)
+    # A mold revision letter; 'p' always starts a print, and a letter followed
+    # by a digit starts an assembly code such as c01 or h02
+    (?P<mold>(?![p])[a-z](?![0-9]))?
+    (?P<assembly>(?:(?:c|g|h)\d+)*)
+    (?P<pattern>pats?\d+)?
+    (?P<print>pr\d+|pb\d+|p[0-9a-z]+)?
+    (?P<suffix>.*)$
+''', re.IGNORECASE | re.VERBOSE)
+
+COMPONENTS = ['base', 'mold', 'assembly', 'pattern', 'print', 'suffix']
+
+
+def parse_part_num(part_num):
+    """
+    Return {'base', 'mold', 'base_mold', 'assembly', 'pattern', 'print',
+    'suffix'} with '' for absent components. Part numbers that don't start
+    with a number keep the whole string as base.
+    """
+    match = PART_NUM_PATTERN.match(part_num)
+    if not match:
+        components = dict.fromkeys(COMPONENTS, '')
+        components['base'] = part_num
+    else:
+        components = {name: match.group(name) or '' for name in COMPONENTS}
+    components['base_mold'] = components['base'] + components['mold']
+    return components
+
+
+def iter_part_nums(db_path=DB_PATH, elements_path=ELEMENTS_CSV):
+    """Yield each distinct part number from the parts table and elements.csv"""
+    # Read and close the database side before yielding anything, so the caller
+    # can write through its own connection without waiting on our read lock
+    conn = sqlite3.connect(db_path)
+    try:
+        db_part_nums = [row[0] for row in conn.execute("SELECT part_num FROM parts")]
+    finally:
+        conn.close()
+
+    seen = set()
+    for part_num in db_part_nums:
+        if part_num not in seen:
+            seen.add(part_num)
+            yield part_num
+
+    with open(elements_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            part_num = row['part_num']
+            if part_num not in seen:
+                seen.add(part_num)
+                yield part_num
+
+
+def write_components(conn, part_nums):
+    """Replace part_num_components with the decomposition of part_nums; returns the row count"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS part_num_components (
+            part_num TEXT PRIMARY KEY,
+            base TEXT NOT NULL,
+            mold TEXT NOT NULL,
+            base_mold TEXT NOT NULL,
+            assembly TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            print TEXT NOT NULL,
+            suffix TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("DELETE FROM part_num_components")
+    for name in ('base', 'base_mold'):
+        conn.execute(f"DROP INDEX IF EXISTS idx_part_num_components_{name}")
+
+    count = 0
+    batch = []
+    for part_num in part_nums:
+        c = parse_part_num(part_num)
+        batch.append((part_num, c['base'], c['mold'], c['base_mold'], c['assembly'], c['pattern'], c['print'], c['suffix']))
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany("INSERT OR IGNORE INTO part_num_components VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+            batch = []
+    conn.executemany("INSERT OR IGNORE INTO part_num_components VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    count += len(batch)
+
+    # Built after the load; base_mold serves family lookups and base serves all molds of a part
+    for name in ('base', 'base_mold'):
+        conn.execute(f"CREATE INDEX idx_part_num_components_{name} ON part_num_components({name})")
+    return count
+
+
+def relatives(conn, part_num, same_mold=True):
+    """Return the part numbers sharing part_num's base mold (or any mold of its base), including itself"""
+    column = 'base_mold' if same_mold else 'base'
+    c = parse_part_num(part_num)
+    rows = conn.execute(f"SELECT part_num FROM part_num_components WHERE {column} = ? ORDER BY part_num",
+                        (c[column],))
+    return [row[0] for row in rows] or [part_num]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decompose part numbers into base mold, print, pattern and assembly codes')
+    parser.add_argument('--db', default=DB_PATH, help='Path to lego.sqlite')
+    parser.add_argument('--elements', default=ELEMENTS_CSV, help='Path to elements.csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    count = write_components(conn, iter_part_nums(args.db, args.elements))
+    conn.commit()
+    elapsed = time.perf_counter() - start
+
+    cursor = conn.cursor()
+    print(f"Decomposed {count} part numbers in {elapsed:.2f}s")
+    for name in ('mold', 'assembly', 'pattern', 'print', 'suffix'):
+        cursor.execute(f"SELECT COUNT(*) FROM part_num_components WHERE {name} != ''")
+        print(f"  with {name}: {cursor.fetchone()[0]}")
+    cursor.execute("""
+        SELECT COUNT(*), SUM(size) FROM (
+            SELECT COUNT(*) AS size FROM part_num_components GROUP BY base_mold HAVING COUNT(*) > 1
+        )
+    """)
+    families, grouped = cursor.fetchone()
+    print(f"{families} base molds group {grouped or 0} part numbers")
+
+    # Parts grouped lexically that have no relationship to anything
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'part_relationships'")
+    if cursor.fetchone()[0]:
+        cursor.execute("""
+            SELECT COUNT(*) FROM part_num_components c
+            WHERE c.base_mold IN (SELECT base_mold FROM part_num_components GROUP BY base_mold HAVING COUNT(*) > 1)
+              AND NOT EXISTS (SELECT 1 FROM part_relationships r WHERE r.child_part_num = c.part_num)
+              AND NOT EXISTS (SELECT 1 FROM part_relationships r WHERE r.parent_part_num = c.part_num)
+        """)
+        print(f"{cursor.fetchone()[0]} of them have no entry in part_relationships")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Normalized part-number keys.
+
+BrickArchitect and Rebrickable don't always write a part number the same
+way ("3001" vs "003001", "3068b" vs "3068B"), so matching uses a key with
+punctuation removed, lowercased and leading zeros stripped. The key is
+stored in parts.part_num_normalized with an index, filled on import and
+cleared by a trigger whenever a part_num changes so the next import
+recomputes it.
+"""
+import re
+
+NON_ALPHANUMERIC = re.compile(r'[^a-zA-Z0-9]')
+
+SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS idx_parts_part_num_normalized ON parts(part_num_normalized)",
+    """
+    CREATE TRIGGER IF NOT EXISTS parts_part_num_normalized_stale AFTER UPDATE OF part_num ON parts
+    WHEN OLD.part_num IS NOT NEW.part_num
+    BEGIN
+        UPDATE parts SET part_num_normalized = NULL WHERE rowid = NEW.rowid;
+    END
+    """
+]
+
+
+def normalize_part_num(part_num):
+    """Return the matching key for a part number: alphanumerics only, lowercase, no leading zeros"""
+    return NON_ALPHANUMERIC.sub('', part_num).lower().lstrip('0')
+
+
+def ensure_normalized_column(conn):
+    """Add parts.part_num_normalized with its index and trigger, and fill any missing keys"""
+    column_names = [column[1] for column in conn.execute("PRAGMA table_info(parts)")]
+    if 'part_num_normalized' not in column_names:
+        conn.execute("ALTER TABLE parts ADD COLUMN part_num_normalized TEXT")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return fill_normalized_keys(conn)
+
+
+def fill_normalized_keys(conn):
+    """Compute the key for rows that don't have one yet; returns the number of rows filled"""
+    rows = conn.execute("SELECT rowid, part_num FROM parts WHERE part_num_normalized IS NULL").fetchall()
+    conn.executemany("UPDATE parts SET part_num_normalized = ? WHERE rowid = ?",
+                     [(normalize_part_num(part_num), rowid) for rowid, part_num in rows])
+    return len(rows)
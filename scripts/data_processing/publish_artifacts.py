@@ -0,0 +1,89 @@
+"""
+Publish generated index files for static serving.
+
+Each artifact is copied to the publish directory under a content-hashed name
+(search_index.json becomes search_index.<hash>.json) next to a gzip -9 copy
+for nginx's gzip_static, so the hashed files can be served with far-future
+cache headers. A small pointer file, which clients revalidate, maps each
+logical name to its current hashed file. A run only updates the entries for
+the files it publishes, so a run that writes fewer outputs keeps the others.
+Hashed files referenced by neither the current nor the previous pointer are
+removed.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+PUBLISH_DIR = 'public/data'
+POINTER_NAME = 'search_index.pointer.json'
+HASH_LENGTH = 16
+# stem.<hash>.ext, optionally .gz; stem and ext together give the logical name
+HASHED_FILE = re.compile(r'^(.+)\.[0-9a-f]{%d}(\.[a-z]+)(?:\.gz)?$' % HASH_LENGTH)
+
+
+def hashed_name(path, content_hash):
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f'{stem}.{content_hash}{ext}'
+
+
+def _write_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def publish(paths, out_dir=PUBLISH_DIR, set_prefixes=()):
+    """
+    Publish each file in paths and return the new pointer. Names starting with
+    one of set_prefixes are published as a complete set, such as the category
+    shards: previous entries of that set which this run didn't publish are dropped.
+    """
+    set_prefixes = tuple(set_prefixes)
+    os.makedirs(out_dir, exist_ok=True)
+    pointer_path = os.path.join(out_dir, POINTER_NAME)
+
+    previous = {}
+    if os.path.exists(pointer_path):
+        with open(pointer_path, 'r') as f:
+            previous = json.load(f)
+
+    published = {os.path.basename(path) for path in paths}
+    pointer = {name: entry for name, entry in previous.items()
+               if name in published or not name.startswith(set_prefixes)}
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        filename = hashed_name(path, content_hash)
+        target = os.path.join(out_dir, filename)
+
+        # Content-addressed files never change once written
+        if not os.path.exists(target):
+            _write_atomic(target, data)
+        if not os.path.exists(target + '.gz'):
+            # mtime=0 keeps the compressed bytes reproducible across runs
+            _write_atomic(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+
+        pointer[os.path.basename(path)] = {
+            'file': filename,
+            'hash': content_hash,
+            'bytes': len(data),
+            'gzip_bytes': os.path.getsize(target + '.gz')
+        }
+
+    _write_atomic(pointer_path, json.dumps(pointer, indent=2).encode('utf-8'))
+
+    # Keep the previous generation so clients holding the old pointer can finish loading
+    keep = {entry['file'] for entry in list(pointer.values()) + list(previous.values())}
+    names = set(pointer) | set(previous)
+    for filename in os.listdir(out_dir):
+        match = HASHED_FILE.match(filename)
+        base = filename[:-3] if filename.endswith('.gz') else filename
+        if match and base not in keep and (match.group(1) + match.group(2) in names
+                                           or match.group(1).startswith(set_prefixes)):
+            os.remove(os.path.join(out_dir, filename))
+
+    return pointer
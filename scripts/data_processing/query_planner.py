@@ -0,0 +1,128 @@
+"""
+Category-intent query planning.
+
+At build time every name token (with the dimension and alias spellings from
+synonyms.expand_tokens) is counted per BrickArchitect category, and category
+names count toward their own category as well. At query time the planner
+keeps every category in which each query token occurs, as a prefix of some
+token there, so "tile 1x2" is matched against a few Tile categories instead
+of every part. A matching part has every query token, so its category is
+always kept and the planned search finds exactly what a global search finds.
+The search itself intersects the inverted index's postings, starting from the
+planned categories' parts when they are fewer than the rarest token's
+postings, so it never re-tokenizes a part name. Queries whose categories
+would still cover too many parts are searched globally.
+"""
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from inverted_index import intersect, lookup
+from search_text import normalize_text
+from synonyms import expand_tokens, query_tokens
+
+# Plans that would still examine more than this share of all parts aren't worth it
+MAX_CANDIDATE_SHARE = 0.25
+# A category name is strong evidence for that category
+CATEGORY_NAME_WEIGHT = 5
+
+# (stats['tokens'], its keys sorted, {prefix: distribution}) for the stats last planned against.
+# Searches reuse a small vocabulary of words, so each prefix's distribution is summed once
+_sorted_tokens = (None, [], {})
+
+
+def build_category_stats(parts, categories):
+    """
+    Return {'tokens': {token: {category_id: count}}, 'category_parts': {category_id: [ordinals]},
+    'part_count': n} for a search index's parts and categories (list of dicts).
+    """
+    token_counts = defaultdict(Counter)
+    category_parts = defaultdict(list)
+
+    for ordinal, part in enumerate(parts):
+        category_parts[part['category_id']].append(ordinal)
+        for token in expand_tokens(part['name']):
+            token_counts[token][part['category_id']] += 1
+
+    for category in categories:
+        for token in set(normalize_text(category['name']).split()):
+            token_counts[token][category['id']] += CATEGORY_NAME_WEIGHT
+
+    return {
+        'tokens': {token: dict(counts.most_common()) for token, counts in sorted(token_counts.items())},
+        'category_parts': dict(category_parts),
+        'part_count': len(parts)
+    }
+
+
+def _prefix_distribution(stats, token):
+    """Return {category_id: count} over every indexed token starting with token, or None"""
+    # Sorted, the tokens sharing a prefix are one contiguous run
+    global _sorted_tokens
+    if _sorted_tokens[0] is not stats['tokens']:
+        _sorted_tokens = (stats['tokens'], sorted(stats['tokens']), {})
+    tokens, distributions = _sorted_tokens[1], _sorted_tokens[2]
+    if token not in distributions:
+        distribution = Counter()
+        for position in range(bisect_left(tokens, token), len(tokens)):
+            if not tokens[position].startswith(token):
+                break
+            distribution.update(stats['tokens'][tokens[position]])
+        distributions[token] = distribution or None
+    return distributions[token]
+
+
+def plan(stats, query, max_candidate_share=MAX_CANDIDATE_SHARE):
+    """
+    Return the category ids that can hold a match for the query, most likely
+    first, or None when the query should be searched globally (unknown tokens
+    or too many candidate parts).
+    """
+    return _plan(stats, set(query_tokens(query)), max_candidate_share)[0]
+
+
+def _plan(stats, tokens, max_candidate_share=MAX_CANDIDATE_SHARE):
+    """Return (categories or None, number of parts in them) for a set of query tokens"""
+    distributions = [_prefix_distribution(stats, token) for token in tokens]
+    if not distributions or any(d is None for d in distributions):
+        return None, stats['part_count']
+
+    # Categories where every token occurs; any other category can't hold a match
+    shared = set(distributions[0])
+    for distribution in distributions[1:]:
+        shared &= set(distribution)
+    if not shared:
+        return None, stats['part_count']
+
+    # Size the plan before ranking it, so broad queries bail out cheaply
+    candidates = sum(len(stats['category_parts'].get(c, ())) for c in shared)
+    if candidates > max_candidate_share * stats['part_count']:
+        return None, stats['part_count']
+    return sorted(shared, key=lambda c: (sum(d[c] for d in distributions), c), reverse=True), candidates
+
+
+def planned_search(stats, index, query):
+    """
+    Search within the planned categories, or the whole index when there is no
+    plan. index is an inverted index built with synonyms.expand_tokens, the
+    tokens the stats were counted from. Returns (ordinals, categories searched
+    or None for global, number of candidate parts).
+    """
+    tokens = set(query_tokens(query))
+    categories, candidates = _plan(stats, tokens)
+    if categories is None:
+        return lookup(index, query), None, candidates
+
+    postings = [index['prefixes'].get(token, []) for token in tokens if len(token) >= index['min_prefix']]
+    if not postings:
+        return [], categories, candidates
+    # As in inverted_index.lookup, the shortest list goes first. The planned categories'
+    # parts only join in when they are shorter still; either way every match is kept
+    postings.sort(key=len)
+    if candidates < len(postings[0]):
+        postings.insert(0, sorted(o for c in categories for o in stats['category_parts'].get(c, ())))
+    result = postings[0]
+    for other in postings[1:]:
+        result = intersect(result, other)
+        if not result:
+            break
+    return list(result), categories, candidates
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Rebuild data/lego.sqlite from the Rebrickable CSV dumps.
+
+Reads part_categories, parts, colors, elements and part_relationships from
+a dump directory (each as NAME.csv or NAME.csv.gz, as downloaded from
+rebrickable.com/downloads), streams them into a new database with journaling
+off and no secondary indexes and builds the indexes once at the end. The
+BrickArchitect enrichment scripts then run against the new file in order,
+followed by the scripts that build the element, family, color and
+part-number lookup tables. Only once every step has succeeded is the file
+swapped into place, so the web app never reads a half-built database. Label
+file paths are carried over from the previous database, since they don't
+come from any dump.
+
+Run it from the repository root:
+
+    python scripts/data_processing/rebuild_database.py --dump-dir ~/Downloads/rebrickable
+"""
+import argparse
+import csv
+import gzip
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+DB_PATH = 'data/lego.sqlite'
+BATCH_SIZE = 10000
+
+# Same order as import_elements.py: White, Light Bluish Gray, Dark Bluish Gray, Black, then any
+PREFERRED_COLORS = [15, 71, 72, 0]
+COLOR_PRIORITY = {color_id: priority for priority, color_id in enumerate(PREFERRED_COLORS)}
+OTHER_COLOR_PRIORITY = len(PREFERRED_COLORS)
+
+# Tables in load order, with the columns read from each dump's header
+SCHEMA = {
+    'part_categories': """
+        CREATE TABLE part_categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT
+        )
+    """,
+    'parts': """
+        CREATE TABLE parts (
+            part_num TEXT PRIMARY KEY,
+            name TEXT,
+            part_cat_id INTEGER,
+            part_material TEXT,
+            label_file TEXT,
+            alt_part_ids TEXT DEFAULT NULL,
+            example_design_id INTEGER
+        )
+    """,
+    'colors': """
+        CREATE TABLE colors (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            rgb TEXT,
+            is_trans TEXT,
+            num_parts INTEGER,
+            num_sets INTEGER,
+            y1 INTEGER,
+            y2 INTEGER
+        )
+    """,
+    'elements': """
+        CREATE TABLE elements (
+            element_id TEXT PRIMARY KEY,
+            part_num TEXT,
+            color_id INTEGER,
+            design_id INTEGER
+        )
+    """,
+    'part_relationships': """
+        CREATE TABLE part_relationships (
+            rel_type TEXT,
+            child_part_num TEXT,
+            parent_part_num TEXT
+        )
+    """,
+}
+
+DUMP_COLUMNS = {
+    'part_categories': ['id', 'name'],
+    'parts': ['part_num', 'name', 'part_cat_id', 'part_material'],
+    'colors': ['id', 'name', 'rgb', 'is_trans', 'num_parts', 'num_sets', 'y1', 'y2'],
+    'elements': ['element_id', 'part_num', 'color_id', 'design_id'],
+    'part_relationships': ['rel_type', 'child_part_num', 'parent_part_num'],
+}
+
+# Built after every table is loaded; names match the incremental importers so re-running them is a no-op
+INDEXES = [
+    "CREATE INDEX idx_parts_part_cat_id ON parts(part_cat_id)",
+    "CREATE INDEX idx_parts_alt_part_ids ON parts(alt_part_ids)",
+    "CREATE INDEX idx_parts_example_design_id ON parts(example_design_id)",
+    "CREATE UNIQUE INDEX idx_elements_element_id ON elements(element_id)",
+    "CREATE INDEX idx_elements_part_num ON elements(part_num)",
+    "CREATE UNIQUE INDEX idx_part_relationships_pair ON part_relationships(child_part_num, parent_part_num)",
+    "CREATE INDEX idx_part_relationships_rel_type ON part_relationships(rel_type)",
+    "CREATE INDEX idx_part_relationships_child_part_num ON part_relationships(child_part_num)",
+    "CREATE INDEX idx_part_relationships_parent_part_num ON part_relationships(parent_part_num)",
+]
+
+# BrickArchitect enrichment, in dependency order; each runs from the repository root against --db
+ENRICHMENT_STEPS = [
+    ('update_database_enhanced.py', {}),   # ba_name, ba_cat_id and part_num_normalized
+    ('update_category_closure.py', {}),    # ba_categories and its closure
+    ('update_category_rollups.py', {}),    # category part counts
+    ('update_dimensions.py', {}),          # dim_* columns, parsed from ba_name first
+]
+
+# Lookup tables derived from the dumps; the search entry points skip features whose tables are missing.
+# Each option is given the named dump, decompressed first if it is a .csv.gz
+DERIVED_STEPS = [
+    ('element_lookup.py', {'--elements': 'elements'}),          # element_lookup, design_lookup
+    ('part_families.py', {'--csv': 'part_relationships'}),      # part_families
+    ('part_colors.py', {'--elements': 'elements', '--colors': 'colors'}),  # color_bits, part_colors, color_parts
+    ('part_num_components.py', {'--elements': 'elements'}),     # part_num_components
+]
+
+
+def find_dump(dump_dir, table):
+    """Return the path of TABLE.csv or TABLE.csv.gz in dump_dir"""
+    for name in (f'{table}.csv', f'{table}.csv.gz'):
+        path = os.path.join(dump_dir, name)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {table}.csv or {table}.csv.gz in {dump_dir}")
+
+
+def read_dump(path, columns):
+    """Yield rows of the given columns from a .csv or .csv.gz dump; missing columns are None"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(column) if column in header else None for column in columns]
+        for row in reader:
+            yield tuple((row[position] or None) if position is not None else None for position in positions)
+
+
+def tune_for_bulk_load(conn):
+    # The database is rebuilt from scratch, so a crash only means running again
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB
+
+
+def rows_for(table, rows, best_design, seen_pairs):
+    """Filter a dump's rows on their way into table, tracking what later steps need"""
+    if table == 'elements':
+        for row in rows:
+            _, part_num, color_id, design_id = row
+            # Ties keep the first element seen, as import_elements.py does
+            if design_id is not None:
+                priority = COLOR_PRIORITY.get(int(color_id), OTHER_COLOR_PRIORITY)
+                current = best_design.get(part_num)
+                if current is None or priority < current[0]:
+                    best_design[part_num] = (priority, int(design_id))
+            yield row
+    elif table == 'part_relationships':
+        # Each child/parent pair is stored once; the first rel_type seen wins
+        for row in rows:
+            pair = (row[1], row[2])
+            if pair not in seen_pairs:
+                seen_pairs.add(pair)
+                yield row
+    else:
+        yield from rows
+
+
+def load_tables(conn, dump_dir):
+    """Create the schema and stream every dump into it; returns [(table, rows, seconds)]"""
+    stats = []
+    best_design = {}
+    seen_pairs = set()
+    for table, create_sql in SCHEMA.items():
+        path = find_dump(dump_dir, table)
+        columns = DUMP_COLUMNS[table]
+        conn.execute(create_sql)
+        insert_sql = (f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                      f"VALUES ({', '.join('?' for _ in columns)})")
+
+        start = time.perf_counter()
+        count = 0
+        rows = rows_for(table, read_dump(path, columns), best_design, seen_pairs)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            conn.executemany(insert_sql, batch)
+            count += len(batch)
+        stats.append((table, count, time.perf_counter() - start))
+        print(f"  {table}: {count} rows from {os.path.basename(path)}")
+
+    conn.execute("CREATE TEMP TABLE design_staging (part_num TEXT PRIMARY KEY, design_id INTEGER)")
+    conn.executemany("INSERT INTO design_staging VALUES (?, ?)",
+                     [(part_num, design_id) for part_num, (_, design_id) in best_design.items()])
+    conn.execute("""
+        UPDATE parts SET example_design_id = s.design_id
+        FROM design_staging s WHERE s.part_num = parts.part_num
+    """)
+    conn.execute("DROP TABLE design_staging")
+    return stats
+
+
+def copy_label_files(conn, previous_db):
+    """Carry label_file over from the database being replaced; returns the number of parts updated"""
+    conn.execute("ATTACH DATABASE ? AS previous", (previous_db,))
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA previous.table_info(parts)")]
+        if 'label_file' not in columns:
+            return 0
+        cursor = conn.execute("""
+            UPDATE parts SET label_file = p.label_file
+            FROM previous.parts p
+            WHERE p.part_num = parts.part_num AND p.label_file IS NOT NULL AND p.label_file != ''
+        """)
+        return cursor.rowcount
+    finally:
+        conn.commit()
+        conn.execute("DETACH DATABASE previous")
+
+
+def plain_csv(path, work_dir):
+    """Return a path to path's contents as a plain .csv, decompressing a .csv.gz into work_dir"""
+    if not path.endswith('.gz'):
+        return path
+    plain_path = os.path.join(work_dir, os.path.basename(path)[:-len('.gz')])
+    if not os.path.exists(plain_path):
+        with gzip.open(path, 'rb') as src, open(plain_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+    return plain_path
+
+
+def run_steps(steps, db_path, dump_dir, work_dir):
+    """Run each script from the current directory against db_path; returns [(script, seconds)]"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for script, options in steps:
+        command = [sys.executable, os.path.join(script_dir, script), '--db', db_path]
+        for option, table in options.items():
+            command += [option, plain_csv(find_dump(dump_dir, table), work_dir)]
+        print(f"\n=== {script} ===", flush=True)
+        start = time.perf_counter()
+        subprocess.run(command, check=True)
+        timings.append((script, time.perf_counter() - start))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild data/lego.sqlite from the Rebrickable CSV dumps')
+    parser.add_argument('--dump-dir', default='data', help='Directory with the .csv or .csv.gz dumps')
+    parser.add_argument('--skip-enrichment', action='store_true',
+                        help='Only load the Rebrickable tables; skip the BrickArchitect and lookup table steps')
+    args = parser.parse_args()
+
+    total_start = time.perf_counter()
+    build_path = DB_PATH + '.rebuild'
+    if os.path.exists(build_path):
+        os.remove(build_path)
+
+    print(f"Loading Rebrickable dumps from {args.dump_dir}...")
+    conn = sqlite3.connect(build_path)
+    tune_for_bulk_load(conn)
+    stats = load_tables(conn, args.dump_dir)
+    conn.commit()
+
+    start = time.perf_counter()
+    for create_index in INDEXES:
+        conn.execute(create_index)
+    conn.execute("ANALYZE")
+    conn.commit()
+    index_time = time.perf_counter() - start
+
+    labels = copy_label_files(conn, DB_PATH) if os.path.exists(DB_PATH) else 0
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    load_time = time.perf_counter() - total_start
+
+    timings = []
+    if not args.skip_enrichment:
+        with tempfile.TemporaryDirectory() as work_dir:
+            try:
+                timings = run_steps(ENRICHMENT_STEPS + DERIVED_STEPS, build_path, args.dump_dir, work_dir)
+            except subprocess.CalledProcessError as e:
+                sys.exit(f"{os.path.basename(e.cmd[1])} failed; {DB_PATH} was left unchanged "
+                         f"and the partial build is in {build_path}")
+
+    # Readers only ever see the old database or the fully enriched new one
+    os.replace(build_path, DB_PATH)
+
+    print("\nRebuild summary:")
+    for table, count, seconds in stats:
+        print(f"  {table:<20} {count:>9} rows {seconds:7.2f}s {count / seconds if seconds else 0:>12,.0f} rows/s")
+    print(f"  {'indexes':<20} {len(INDEXES):>9} built {index_time:6.2f}s")
+    print(f"  label_file copied for {labels} parts")
+    for script, seconds in timings:
+        print(f"  {script:<30} {seconds:7.2f}s")
+    print(f"Loaded in {load_time:.2f}s, finished in {time.perf_counter() - total_start:.2f}s")
+    if not args.skip_enrichment:
+        print("Run scripts/update_alt_part_ids.js to fill alt_part_ids and update_sort_orders.js "
+              "to fill ba_categories.sort_order for the web app.")
+
+
+if __name__ == '__main__':
+    main()
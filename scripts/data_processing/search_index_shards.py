@@ -0,0 +1,107 @@
+"""
+Split the search index into one shard per top-level BrickArchitect category.
+
+Each shard holds the parts filed anywhere under one top-level category (such
+as "1. Basic") along with that category subtree, in the v1 record layout.
+manifest.json lists every shard with its content hash, part count and byte
+size, and maps each category id to the shard that holds it, so a client can
+fetch only the shards a category filter needs and cache each one on its own.
+Shards whose content is unchanged are not rewritten.
+"""
+import hashlib
+import json
+import os
+
+SHARD_DIR = 'data/search_index_shards'
+MANIFEST_NAME = 'manifest.json'
+SHARD_PREFIX = 'category-'
+UNKNOWN_SHARD = 'unknown'
+
+
+def root_category(categories, cat_id):
+    """Walk parent links from cat_id up to its top-level category id"""
+    seen = set()
+    while categories[cat_id]['parent_id'] in categories and cat_id not in seen:
+        seen.add(cat_id)
+        cat_id = categories[cat_id]['parent_id']
+    return cat_id
+
+
+def build_shards(parts, categories):
+    """Group parts and categories (list of dicts) by top-level category"""
+    by_id = {category['id']: category for category in categories}
+    roots = {cat_id: root_category(by_id, cat_id) for cat_id in by_id}
+
+    shards = {}
+    for category in categories:
+        if category['id'] == roots[category['id']]:
+            shards[category['id']] = {'name': category['name'], 'parts': [], 'categories': []}
+    shards[UNKNOWN_SHARD] = {'name': 'Unknown', 'parts': [], 'categories': []}
+
+    for category in categories:
+        shards[roots[category['id']]]['categories'].append(category)
+
+    for part in parts:
+        shards[roots.get(part['category_id'], UNKNOWN_SHARD)]['parts'].append(part)
+
+    if not shards[UNKNOWN_SHARD]['parts']:
+        del shards[UNKNOWN_SHARD]
+
+    return shards, roots
+
+
+def write_shards(shards, roots, shard_dir=SHARD_DIR):
+    """Write changed shards and the manifest, and remove shards that no longer exist"""
+    os.makedirs(shard_dir, exist_ok=True)
+
+    entries = []
+    rewritten = 0
+    for key, shard in shards.items():
+        filename = f'{SHARD_PREFIX}{key}.json'
+        payload = json.dumps(
+            {'parts': shard['parts'], 'categories': shard['categories']},
+            separators=(',', ':')
+        ).encode('utf-8')
+        content_hash = hashlib.sha256(payload).hexdigest()[:16]
+
+        path = os.path.join(shard_dir, filename)
+        if not os.path.exists(path) or _file_hash(path) != content_hash:
+            with open(path, 'wb') as f:
+                f.write(payload)
+            rewritten += 1
+
+        entries.append({
+            'category_id': key,
+            'name': shard['name'],
+            'file': filename,
+            'hash': content_hash,
+            'parts': len(shard['parts']),
+            'bytes': len(payload)
+        })
+
+    # Drop shards for top-level categories that have gone away
+    current = {entry['file'] for entry in entries}
+    for filename in os.listdir(shard_dir):
+        if filename.startswith(SHARD_PREFIX) and filename.endswith('.json') and filename not in current:
+            os.remove(os.path.join(shard_dir, filename))
+
+    manifest = {
+        'shards': entries,
+        'category_shards': roots
+    }
+    with open(os.path.join(shard_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest, rewritten
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def shards_for_categories(manifest, category_ids):
+    """Return the manifest entries needed to search within the given categories"""
+    wanted = {manifest['category_shards'][cat_id] for cat_id in category_ids
+              if cat_id in manifest['category_shards']}
+    return [entry for entry in manifest['shards'] if entry['category_id'] in wanted]
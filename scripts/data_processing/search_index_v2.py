@@ -0,0 +1,121 @@
+"""
+Schema v2 of the search index.
+
+v1 repeats each part's category_name and full category_path, which makes up
+most of the file. v2 stores every category once, refers to categories by
+their position in the categories list, and interns category names into a
+string table so each path is a short list of string ids. Records are arrays
+whose columns are listed in part_fields and category_fields, and the file is
+written minified:
+
+    {
+      "schema": 2,
+      "strings": ["1. Basic", "Brick", ...],
+      "category_fields": ["id", "name", "parent", "path"],
+      "categories": [["1", 0, null, [0]], ["15", 1, 0, [0, 1]], ...],
+      "part_fields": ["id", "name", "normalized_name", "category"],
+      "parts": [["3005", "1×1 Brick", "1 1 brick", 2], ...]
+    }
+
+name and path entries are string ids. parent and category are category
+positions; a string there is an id that has no category record (the part's
+category is shown as "Unknown"), and a null parent marks a top-level category.
+"""
+import json
+
+SCHEMA_VERSION = 2
+CATEGORY_FIELDS = ['id', 'name', 'parent', 'path']
+PART_FIELDS = ['id', 'name', 'normalized_name', 'category']
+
+
+def build_v2(parts, categories, index=None):
+    """Convert enriched v1 parts and categories (list of dicts) to a v2 document"""
+    strings = []
+    string_ids = {}
+
+    def intern(text):
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    positions = {category['id']: position for position, category in enumerate(categories)}
+
+    def category_ref(cat_id):
+        if not cat_id:
+            return None
+        return positions.get(cat_id, cat_id)
+
+    category_records = [
+        [
+            category['id'],
+            intern(category['name']),
+            category_ref(category['parent_id']),
+            [intern(name) for name in category['full_path']]
+        ]
+        for category in categories
+    ]
+
+    part_records = [
+        [part['id'], part['name'], part['normalized_name'], category_ref(part['category_id'])]
+        for part in parts
+    ]
+
+    document = {
+        'schema': SCHEMA_VERSION,
+        'strings': strings,
+        'category_fields': CATEGORY_FIELDS,
+        'categories': category_records,
+        'part_fields': PART_FIELDS,
+        'parts': part_records
+    }
+    if index is not None:
+        document['index'] = index
+    return document
+
+
+def write_v2(path, document):
+    with open(path, 'w', encoding='utf-8') as f:
+        # Raw UTF-8 keeps "×" at two bytes instead of a six byte \u escape
+        json.dump(document, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def expand_v2(document):
+    """Rebuild the v1 {'parts': [...], 'categories': [...]} layout from a v2 document"""
+    if document.get('schema') != SCHEMA_VERSION:
+        raise ValueError(f"Expected a schema {SCHEMA_VERSION} search index")
+
+    strings = document['strings']
+    records = document['categories']
+
+    def category_id(ref):
+        if ref is None:
+            return ''
+        return records[ref][0] if isinstance(ref, int) else ref
+
+    categories = []
+    for cat_id, name, parent, path in records:
+        categories.append({
+            'id': cat_id,
+            'name': strings[name],
+            'parent_id': category_id(parent),
+            'full_path': [strings[s] for s in path]
+        })
+
+    parts = []
+    for part_id, name, normalized_name, category in document['parts']:
+        part = {
+            'id': part_id,
+            'name': name,
+            'normalized_name': normalized_name,
+            'category_id': category_id(category)
+        }
+        if isinstance(category, int):
+            part['category_name'] = categories[category]['name']
+            part['category_path'] = categories[category]['full_path']
+        else:
+            part['category_name'] = 'Unknown'
+            part['category_path'] = ['Unknown']
+        parts.append(part)
+
+    return {'parts': parts, 'categories': categories}
@@ -0,0 +1,20 @@
+"""
+Text normalization shared by the search index builders.
+"""
+import re
+
+
+# Function to clean and normalize part names
+def normalize_text(text):
+    # Convert to lowercase
+    text = text.lower()
+
+    # Remove any special characters and extra whitespace
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+
+    return text
+
+
+def tokenize(text):
+    return normalize_text(text).split()
@@ -0,0 +1,114 @@
+"""
+Typo-tolerant spelling suggestions using symmetric delete.
+
+Every vocabulary word is stored under each string obtained by deleting up to
+max_distance characters from it. A misspelled query generates its own
+deletes the same way, and any word sharing a delete is a candidate, which is
+then checked with a real edit distance. Lookups touch a few dozen dict
+entries instead of comparing against the whole vocabulary.
+"""
+import json
+import re
+from collections import Counter
+
+from search_text import normalize_text
+
+MAX_DISTANCE = 2
+SPELLING_PATH = 'data/search_spelling.json'
+
+# Only words with letters are worth correcting; "2", "45" and "1⅔" are not
+WORD_PATTERN = re.compile(r'[^\W\d_]')
+
+
+def build_vocabulary(names):
+    """Count the correctable tokens of every name"""
+    vocabulary = Counter()
+    for name in names:
+        if name:
+            vocabulary.update(t for t in normalize_text(name).split() if WORD_PATTERN.search(t))
+    return vocabulary
+
+
+def deletes(word, max_distance=MAX_DISTANCE):
+    """Return every string made by deleting up to max_distance characters from word"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        results.update(frontier)
+    return results
+
+
+def build_dictionary(vocabulary, max_distance=MAX_DISTANCE):
+    index = {}
+    for word in sorted(vocabulary):
+        for deleted in deletes(word, max_distance):
+            index.setdefault(deleted, []).append(word)
+    return {
+        'max_distance': max_distance,
+        'words': dict(sorted(vocabulary.items())),
+        'deletes': index
+    }
+
+
+def edit_distance(a, b, limit=None):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)"""
+    if a == b:
+        return 0
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def suggest(dictionary, word, max_distance=None, limit=5):
+    """Return up to limit (word, distance, frequency) corrections, closest and most common first"""
+    if max_distance is None:
+        max_distance = dictionary['max_distance']
+    word = normalize_text(word)
+    words = dictionary['words']
+
+    candidates = set()
+    for deleted in deletes(word, max_distance):
+        candidates.update(dictionary['deletes'].get(deleted, ()))
+
+    results = []
+    for candidate in candidates:
+        distance = edit_distance(word, candidate, max_distance)
+        if distance <= max_distance:
+            results.append((candidate, distance, words[candidate]))
+
+    results.sort(key=lambda r: (r[1], -r[2], r[0]))
+    return results[:limit]
+
+
+def brute_force_suggest(vocabulary, word, max_distance=MAX_DISTANCE, limit=5):
+    """Reference implementation comparing word against every vocabulary entry"""
+    word = normalize_text(word)
+    results = []
+    for candidate, frequency in vocabulary.items():
+        distance = edit_distance(word, candidate, max_distance)
+        if distance <= max_distance:
+            results.append((candidate, distance, frequency))
+    results.sort(key=lambda r: (r[1], -r[2], r[0]))
+    return results[:limit]
+
+
+def write_dictionary(dictionary, path=SPELLING_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dictionary, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def load_dictionary(path=SPELLING_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,101 @@
+"""
+Synonym and alias expansion applied when part tokens are indexed.
+
+The web search expands a query like "2x2" into several spellings and ORs a
+LIKE clause for each. Here the expansion happens once, at index time: every
+part is indexed under its dimensions written as "2x2" (however the name
+spells them), under every alias of its words ("plt" and "plates" for
+"plate"), and under the words of its Rebrickable name when one is given. A
+query only needs its dimensions written the same way, after which each query
+token is a single posting lookup.
+"""
+import os
+import re
+import sqlite3
+
+from search_text import normalize_text
+
+DB_PATH = 'data/lego.sqlite'
+
+# Matches 2x2, 2 x 2, 2×2, 2 × 2 and three-part forms like 1×2×3
+DIMENSION_PATTERN = re.compile(r'(\d+)\s*[x×]\s*(\d+)(?:\s*[x×]\s*(\d+))?', re.IGNORECASE)
+
+# Canonical word -> other spellings people type or other sources use
+SYNONYMS = {
+    'brick': ['bricks', 'brk'],
+    'plate': ['plates', 'plt'],
+    'tile': ['tiles', 'tl'],
+    'slope': ['slopes', 'sloped', 'slp'],
+    'inverted': ['inv'],
+    'round': ['rnd', 'circular'],
+    'technic': ['tech'],
+    'bracket': ['brackets', 'brkt'],
+    'hinge': ['hinges'],
+    'wedge': ['wedges'],
+    'curved': ['curve'],
+    'stud': ['studs'],
+    'hole': ['holes'],
+    'pin': ['pins'],
+    'axle': ['axles'],
+    'clip': ['clips'],
+    'bar': ['bars'],
+    'panel': ['panels'],
+    'w': ['with'],
+    'minifig': ['minifigure', 'minifigures', 'fig'],
+    'windscreen': ['windshield'],
+    'modified': ['mod'],
+}
+
+# Every spelling, including the canonical one, maps to its whole group
+SYNONYM_GROUPS = {}
+for _canonical, _aliases in SYNONYMS.items():
+    _group = {_canonical, *_aliases}
+    for _word in _group:
+        SYNONYM_GROUPS.setdefault(_word, set()).update(_group)
+
+
+def dimension_tokens(text):
+    """Return dimension tokens such as '1x2' and '1x2x3' found in text"""
+    tokens = set()
+    for match in DIMENSION_PATTERN.finditer(text):
+        first, second, third = match.groups()
+        tokens.add(f'{first}x{second}')
+        if third:
+            tokens.add(f'{first}x{second}x{third}')
+    return tokens
+
+
+def canonicalize(text):
+    """Normalize text with every dimension written as a single 'AxB' token"""
+    def joined(match):
+        return 'x'.join(group for group in match.groups() if group)
+    return normalize_text(DIMENSION_PATTERN.sub(lambda m: f' {joined(m)} ', text))
+
+
+def query_tokens(text):
+    return canonicalize(text).split()
+
+
+def expand_tokens(text, alias_names=()):
+    """Return every token a part named text should be found under"""
+    tokens = set(normalize_text(text).split())
+    tokens.update(dimension_tokens(text))
+    for name in alias_names:
+        if name:
+            tokens.update(normalize_text(name).split())
+            tokens.update(dimension_tokens(name))
+
+    for token in list(tokens):
+        tokens.update(SYNONYM_GROUPS.get(token, ()))
+    return tokens
+
+
+def load_rebrickable_names(db_path=DB_PATH):
+    """Return {part_num: Rebrickable name}, or {} when the database isn't available"""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT part_num, name FROM parts"))
+    finally:
+        conn.close()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import argparse
+import sqlite3
+
+from category_closure import ensure_closure_table, import_categories
+from category_rollups import refresh_rollups
+
+parser = argparse.ArgumentParser(description='Import ba_categories.csv and rebuild the category closure table')
+parser.add_argument('--db', default='data/lego.sqlite', help='Path to lego.sqlite')
+args = parser.parse_args()
+
+# Connect to SQLite database
+print("Connecting to database...")
+conn = sqlite3.connect(args.db)
+cursor = conn.cursor()
+
+# Create the closure table, its indexes and the triggers that maintain it
+print("Creating category closure table...")
+ensure_closure_table(conn)
+
+# Re-import ba_categories.csv and rebuild the closure in the same transaction
+print("Importing categories...")
+inserted, updated, deleted = import_categories(conn)
+
+# Part counts depend on the tree, so recompute them if update_category_rollups.py installed them
+cursor.execute("PRAGMA table_info(ba_categories)")
+if 'direct_parts_count' in [column[1] for column in cursor.fetchall()]:
+    print("Recomputing category part counts...")
+    refresh_rollups(conn)
+
+# Commit changes and close connection
+conn.commit()
+
+cursor.execute("SELECT COUNT(*), MAX(depth) FROM ba_category_closure")
+row_count, max_depth = cursor.fetchone()
+cursor.execute("SELECT COUNT(*) FROM ba_categories")
+category_count = cursor.fetchone()[0]
+conn.close()
+
+print(f"Categories: {inserted} added, {updated} updated, {deleted} removed ({category_count} total).")
+print(f"Update complete. {row_count} closure rows, maximum depth {max_depth}.")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+import argparse
+import sqlite3
+
+from category_closure import ensure_closure_table, rebuild_closure
+from category_rollups import ensure_rollup_columns, refresh_rollups
+
+parser = argparse.ArgumentParser(description='Install category part-count rollups and recompute them')
+parser.add_argument('--db', default='data/lego.sqlite', help='Path to lego.sqlite')
+args = parser.parse_args()
+
+# Connect to SQLite database
+print("Connecting to database...")
+conn = sqlite3.connect(args.db)
+cursor = conn.cursor()
+
+# Rollups walk the category closure, so make sure it exists first
+cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'ba_category_closure'")
+if not cursor.fetchone()[0]:
+    print("Creating category closure table...")
+    ensure_closure_table(conn)
+    rebuild_closure(conn)
+
+# Add the count columns and the triggers that keep them current from now on
+print("Installing rollup triggers...")
+ensure_rollup_columns(conn)
+
+# One pass over the closure fixes any counts that drifted before the triggers existed
+print("Computing category part counts...")
+changed = refresh_rollups(conn)
+
+# Commit changes and close connection
+conn.commit()
+
+cursor.execute("SELECT COUNT(*), SUM(direct_parts_count) FROM ba_categories")
+category_count, part_count = cursor.fetchone()
+conn.close()
+
+print(f"Update complete. {changed} of {category_count} categories changed, {part_count or 0} categorized parts.")
@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
+import argparse
 import csv
 import sqlite3
 import os
+import time
+
+parser = argparse.ArgumentParser(description='Copy BrickArchitect names and categories into the parts table')
+parser.add_argument('--bulk', action='store_true',
+                    help='Load the CSV into a staging table and update with set-based statements')
+args = parser.parse_args()
 
 # Connect to SQLite database
 print("Connecting to database...")
@@ -31,12 +38,47 @@ not_found_parts = []
 with open('data/ba_parts.csv', 'r') as f:
     reader = csv.reader(f)
     next(reader)  # Skip header row
+    rows = [(row[0], row[1], row[2]) for row in reader]
+
+if args.bulk:
+    # Stage the whole CSV, then update and find misses with a handful of statements
+    timings = []
+    start = time.perf_counter()
+    cursor.execute("""
+        CREATE TEMP TABLE ba_parts_staging (
+            part_num TEXT PRIMARY KEY,
+            ba_name TEXT,
+            ba_cat_id INTEGER
+        )
+    """)
+    # Later rows win, as they would with one UPDATE per row
+    cursor.executemany("INSERT OR REPLACE INTO ba_parts_staging (part_num, ba_name, ba_cat_id) VALUES (?, ?, ?)", rows)
+    timings.append(('stage', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    cursor.execute("""
+        UPDATE parts SET ba_name = s.ba_name, ba_cat_id = s.ba_cat_id
+        FROM ba_parts_staging s
+        WHERE parts.part_num = s.part_num
+    """)
+    updated_count = cursor.rowcount
+    timings.append(('update', time.perf_counter() - start))
 
-    for row in reader:
-        part_num = row[0]
-        ba_name = row[1]
-        ba_cat_id = row[2]
+    start = time.perf_counter()
+    cursor.execute("""
+        SELECT s.part_num FROM ba_parts_staging s
+        WHERE NOT EXISTS (SELECT 1 FROM parts p WHERE p.part_num = s.part_num)
+        ORDER BY s.rowid
+    """)
+    not_found_parts = [row[0] for row in cursor.fetchall()]
+    not_found_count = len(not_found_parts)
+    cursor.execute("DROP TABLE ba_parts_staging")
+    timings.append(('anti-join', time.perf_counter() - start))
 
+    for phase, seconds in timings:
+        print(f"  {phase}: {seconds * 1000:.1f} ms")
+else:
+    for part_num, ba_name, ba_cat_id in rows:
         # Update the parts table
         cursor.execute(
             "UPDATE parts SET ba_name = ?, ba_cat_id = ? WHERE part_num = ?",
@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
+import argparse
 import csv
 import sqlite3
 import os
-import re
+
+from part_numbers import ensure_normalized_column, normalize_part_num
+
+parser = argparse.ArgumentParser(description='Match BrickArchitect parts to database parts and fill ba_name and ba_cat_id')
+parser.add_argument('--db', default='data/lego.sqlite', help='Path to lego.sqlite')
+args = parser.parse_args()
 
 # Connect to SQLite database
 print("Connecting to database...")
-conn = sqlite3.connect('data/lego.sqlite')
+conn = sqlite3.connect(args.db)
 cursor = conn.cursor()
 
 # Check if ba_name and ba_cat_id columns exist in the parts table
@@ -37,82 +43,55 @@ with open('data/ba_parts.csv', 'r') as f:
             'ba_cat_id': row[2]
         })
 
-# Function to normalize part numbers
-def normalize_part_num(part_num):
-    # Remove non-alphanumeric characters
-    normalized = re.sub(r'[^a-zA-Z0-9]', '', part_num)
-    # Convert to lowercase
-    normalized = normalized.lower()
-    # Remove leading zeros
-    normalized = normalized.lstrip('0')
-    return normalized
-
-# Create a mapping of normalized part numbers to original BA part data
-normalized_to_ba = {}
-for part in ba_parts:
-    normalized = normalize_part_num(part['part_num'])
-    if normalized not in normalized_to_ba:
-        normalized_to_ba[normalized] = part
-
-# Get all part numbers from the database
-print("Fetching part numbers from database...")
-cursor.execute("SELECT part_num FROM parts")
-db_part_nums = [row[0] for row in cursor.fetchall()]
-
-# Create a mapping of normalized DB part numbers to original part numbers
-normalized_to_db = {}
-for part_num in db_part_nums:
-    normalized = normalize_part_num(part_num)
-    if normalized not in normalized_to_db:
-        normalized_to_db[normalized] = part_num
+# Make sure every database part has its persisted, indexed normalized key
+print("Updating normalized part numbers...")
+filled = ensure_normalized_column(conn)
+if filled:
+    print(f"Computed normalized part numbers for {filled} parts")
+
+# Stage the BA parts with their keys so matching is one indexed join
+cursor.execute("CREATE TEMP TABLE ba_parts_staging (seq INTEGER PRIMARY KEY, part_num TEXT, part_num_normalized TEXT)")
+cursor.executemany(
+    "INSERT INTO ba_parts_staging (seq, part_num, part_num_normalized) VALUES (?, ?, ?)",
+    [(seq, part['part_num'], normalize_part_num(part['part_num'])) for seq, part in enumerate(ba_parts)]
+)
+
+# Every database part sharing a BA part's key, in database order. An exact
+# part_num match is one of them, so both passes come from the same join.
+print("Matching part numbers...")
+cursor.execute("""
+    SELECT s.seq, p.part_num
+    FROM ba_parts_staging s
+    JOIN parts p ON p.part_num_normalized = s.part_num_normalized
+    ORDER BY s.seq, p.rowid
+""")
+candidates = {}
+for seq, db_part_num in cursor.fetchall():
+    candidates.setdefault(seq, []).append(db_part_num)
+cursor.execute("DROP TABLE ba_parts_staging")
+
+direct_updates = []
+normalized_updates = []
+not_matched_parts = []
+for seq, part in enumerate(ba_parts):
+    db_part_nums = candidates.get(seq)
+    if not db_part_nums:
+        not_matched_parts.append(part['part_num'])
+    elif part['part_num'] in db_part_nums:
+        direct_updates.append((part['ba_name'], part['ba_cat_id'], part['part_num']))
+    else:
+        normalized_updates.append((part['ba_name'], part['ba_cat_id'], db_part_nums[0]))
 
 # First pass: Direct matches
 print("Performing direct updates...")
-updated_count = 0
-for part in ba_parts:
-    part_num = part['part_num']
-    ba_name = part['ba_name']
-    ba_cat_id = part['ba_cat_id']
-
-    cursor.execute(
-        "UPDATE parts SET ba_name = ?, ba_cat_id = ? WHERE part_num = ?",
-        (ba_name, ba_cat_id, part_num)
-    )
-
-    if cursor.rowcount > 0:
-        updated_count += 1
+cursor.executemany("UPDATE parts SET ba_name = ?, ba_cat_id = ? WHERE part_num = ?", direct_updates)
+updated_count = len(direct_updates)
 
 # Second pass: Normalized matches for parts not directly matched
 print("Performing normalized updates...")
-normalized_updated_count = 0
-not_matched_count = 0
-not_matched_parts = []
-
-for ba_part in ba_parts:
-    normalized_ba = normalize_part_num(ba_part['part_num'])
-
-    # Skip if we already successfully updated this part in the first pass
-    cursor.execute(
-        "SELECT 1 FROM parts WHERE part_num = ? AND ba_name IS NOT NULL",
-        (ba_part['part_num'],)
-    )
-    if cursor.fetchone():
-        continue
-
-    # Try to find a matching normalized part number in the database
-    if normalized_ba in normalized_to_db:
-        db_part_num = normalized_to_db[normalized_ba]
-
-        cursor.execute(
-            "UPDATE parts SET ba_name = ?, ba_cat_id = ? WHERE part_num = ?",
-            (ba_part['ba_name'], ba_part['ba_cat_id'], db_part_num)
-        )
-
-        if cursor.rowcount > 0:
-            normalized_updated_count += 1
-    else:
-        not_matched_count += 1
-        not_matched_parts.append(ba_part['part_num'])
+cursor.executemany("UPDATE parts SET ba_name = ?, ba_cat_id = ? WHERE part_num = ?", normalized_updates)
+normalized_updated_count = len(normalized_updates)
+not_matched_count = len(not_matched_parts)
 
 # Commit changes and close connection
 conn.commit()
@@ -127,4 +106,5 @@ print(f"  - {not_matched_count} parts from CSV still not found in the database")
 if not_matched_count > 0:
     with open('data/not_matched_parts.txt', 'w') as f:
         f.write('\n'.join(not_matched_parts))
-    print(f"List of not matched parts written to data/not_matched_parts.txt")
\ No newline at end of file
+    print(f"List of not matched parts written to data/not_matched_parts.txt")
+    print("Run fuzzy_match.py to list candidate matches for review")
\ No newline at end of file
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import argparse
+import sqlite3
+
+from dimensions import parse_dimensions
+
+parser = argparse.ArgumentParser(description='Parse part dimensions from names into the dim_* columns')
+parser.add_argument('--db', default='data/lego.sqlite', help='Path to lego.sqlite')
+args = parser.parse_args()
+
+# Connect to SQLite database
+print("Connecting to database...")
+conn = sqlite3.connect(args.db)
+cursor = conn.cursor()
+
+# Check if the dimension columns exist in the parts table
+cursor.execute("PRAGMA table_info(parts)")
+columns = cursor.fetchall()
+column_names = [column[1] for column in columns]
+
+# Add columns if they don't exist
+for column, column_type in (('dim_width', 'INTEGER'), ('dim_length', 'INTEGER'), ('dim_height', 'REAL')):
+    if column not in column_names:
+        print(f"Adding {column} column to parts table...")
+        cursor.execute(f"ALTER TABLE parts ADD COLUMN {column} {column_type}")
+
+# BrickArchitect names are more consistent, so prefer them over Rebrickable names
+print("Parsing dimensions from part names...")
+cursor.execute("SELECT part_num, ba_name, name FROM parts")
+updates = []
+for part_num, ba_name, name in cursor.fetchall():
+    dimensions = parse_dimensions(ba_name) or parse_dimensions(name) or (None, None, None)
+    updates.append((*dimensions, part_num))
+
+cursor.executemany(
+    "UPDATE parts SET dim_width = ?, dim_length = ?, dim_height = ? WHERE part_num = ?",
+    updates
+)
+
+# A composite index serves exact widths with length ranges ("2×N, N ≥ 6") as one range scan
+print("Creating dimension index...")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_parts_dimensions ON parts(dim_width, dim_length, dim_height)")
+
+# Commit changes and close connection
+conn.commit()
+
+cursor.execute("SELECT COUNT(*) FROM parts WHERE dim_width IS NOT NULL")
+with_dimensions = cursor.fetchone()[0]
+conn.close()
+
+print(f"Update complete. {with_dimensions} of {len(updates)} parts have dimensions.")
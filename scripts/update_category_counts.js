@@ -93,7 +93,20 @@ async function updateCategoryCount(db, categoryId) {
   return count
 }
 
+async function hasRollupTriggers(db) {
+  // Installed by scripts/data_processing/update_category_rollups.py
+  const trigger = await db.get(
+    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = 'parts_rollup_update'"
+  )
+  return !!trigger
+}
+
 async function updateAllCategoryCounts(db) {
+  if (await hasRollupTriggers(db)) {
+    console.log('Category counts are maintained by database triggers, skipping full recount')
+    return
+  }
+
   console.log('Updating counts for all categories...')
   const categoryIds = await getAllCategoryIds(db)
 